@@ -0,0 +1,87 @@
+"""
+Benchmark response compression: size and time of catalog and admin pages
+sent uncompressed, gzipped and brotli-compressed (when brotli is installed),
+next to compressing the whole body in one go as the best case.
+Runs against a throwaway SQLite database.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import zlib
+
+from app import create_app
+from models import db, User, Category, Product
+from utils.compression import brotli
+
+PAGES = ['/', '/category/Benchmark', '/admin/products?per_page={products}']
+
+
+def setup_store(app, products):
+    """One category of products and an admin to view the admin pages as"""
+    with app.app_context():
+        db.create_all()
+        category = Category(name='Benchmark')
+        admin = User(name='Admin', email='admin@example.com', password='benchmark', is_admin=True)
+        db.session.add_all([category, admin])
+        db.session.flush()
+        db.session.add_all([
+            Product(name=f'Product {i}', description='A carefully made product for everyday use. ' * 3,
+                    price=100 + i, stock=i % 50, category_id=category.id)
+            for i in range(products)
+        ])
+        db.session.commit()
+        return admin.id
+
+
+def fetch(client, path, encoding, repeat):
+    """(body, median seconds) for path requested with Accept-Encoding: encoding"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, headers={'Accept-Encoding': encoding})
+        body = response.get_data()
+        times.append(time.perf_counter() - started)
+    if encoding != 'identity' and response.headers.get('Content-Encoding') != encoding:
+        raise SystemExit(f"❌ {path} was not sent with {encoding}")
+    return body, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure compressed page sizes and response times")
+    parser.add_argument('--products', type=int, default=3000, help="products in the catalog (default: 3000)")
+    parser.add_argument('--repeat', type=int, default=3, help="requests per page and encoding (default: 3)")
+    args = parser.parse_args()
+
+    database = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database, 'COMPRESS_RESPONSES': True, 'VIEW_COUNTING': False})
+    admin_id = setup_store(app, args.products)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin_id)
+        session['_fresh'] = True
+
+    encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+    print(f"Catalog of {args.products} products, median of {args.repeat} requests\n")
+    print(f"{'page':<36}{'encoding':<10}{'bytes':>12}{'time':>10}{'one-shot':>12}")
+    for page in PAGES:
+        path = page.format(products=args.products)
+        plain = None
+        for encoding in encodings:
+            body, seconds = fetch(client, path, encoding, args.repeat)
+            if encoding == 'identity':
+                plain, one_shot = body, None
+            elif encoding == 'gzip':
+                one_shot = len(zlib.compress(plain, app.config['COMPRESS_LEVEL']))
+            else:
+                one_shot = len(brotli.compress(plain, quality=app.config['COMPRESS_BR_QUALITY']))
+            one_shot = f"{one_shot:,}" if one_shot is not None else '-'
+            print(f"{path[:35]:<36}{encoding:<10}{len(body):>12,}{seconds * 1000:>8.0f}ms{one_shot:>12}")
+    if brotli is None:
+        print("\n(brotli is not installed; pip install brotli to include it)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark product page throughput with view counting disabled, write-behind
+(the default) and a database UPDATE per hit, and check that every counted
+view reaches the database. Runs against a throwaway SQLite database.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from app import create_app
+from models import db, Category, Product
+import routes.main
+
+MODES = ['disabled', 'write-behind', 'per-hit UPDATE']
+HOT_PRODUCTS = (1, 1, 1, 2, 3)  # Most views go to a few popular products
+
+original_count_view = routes.main.count_view
+
+
+def count_view_per_hit(product_id):
+    """What write-behind replaces: one UPDATE and commit per page view"""
+    product = Product.__table__
+    db.session.execute(db.update(product).where(product.c.id == product_id)
+                       .values(view_count=product.c.view_count + 1))
+    db.session.commit()
+
+
+def setup_store(mode, products):
+    """A fresh app and database for one run"""
+    database = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database, 'VIEW_COUNTING': mode == 'write-behind'})
+    with app.app_context():
+        db.create_all()
+        category = Category(name='Benchmark')
+        db.session.add(category)
+        db.session.flush()
+        db.session.execute(db.insert(Product), [
+            {'name': f'Product {i}', 'description': 'A carefully made product for everyday use.',
+             'price': 100 + i, 'stock': 5, 'category_id': category.id}
+            for i in range(products)
+        ])
+        db.session.commit()
+    return app
+
+
+def browse(app, threads, requests, products, seed):
+    """Request product pages from threads in parallel; returns the number of pages served"""
+    served = []
+    lock = threading.Lock()
+
+    def visitor(seed):
+        rnd = random.Random(seed)
+        client = app.test_client()
+        ok = 0
+        for _ in range(requests):
+            product_id = rnd.choice(HOT_PRODUCTS + (rnd.randint(1, products),))
+            ok += client.get(f'/product/{product_id}').status_code == 200
+        with lock:
+            served.append(ok)
+
+    workers = [threading.Thread(target=visitor, args=(seed * 1000 + i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(served)
+
+
+def run(mode, args):
+    """One timed run; returns (requests/s, pages served, views stored)"""
+    app = setup_store(mode, args.products)
+    routes.main.count_view = count_view_per_hit if mode == 'per-hit UPDATE' else original_count_view
+    counter = app.extensions['view_counter']
+
+    started = time.perf_counter()
+    if args.processes > 1:
+        # Like gunicorn with preload_app: fork workers from the loaded app, flush at worker exit
+        children = []
+        for i in range(args.processes):
+            pid = os.fork()
+            if pid == 0:
+                with app.app_context():
+                    db.engine.dispose(close=False)  # As gunicorn.conf.py's post_fork does
+                served = browse(app, args.threads, args.requests, args.products, seed=i)
+                if counter is not None:
+                    counter.close()
+                os._exit(0 if served == args.threads * args.requests else 1)
+            children.append(pid)
+        if any(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) for pid in children):
+            raise SystemExit(f"❌ {mode}: some product pages failed")
+        served = args.processes * args.threads * args.requests
+    else:
+        served = browse(app, args.threads, args.requests, args.products, seed=0)
+    elapsed = time.perf_counter() - started
+    if counter is not None:
+        counter.close()
+
+    with app.app_context():
+        stored = db.session.execute(db.select(db.func.sum(Product.view_count))).scalar()
+        db.engine.dispose()
+    return served / elapsed, served, stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cost of counting product page views")
+    parser.add_argument('--threads', type=int, default=8, help="parallel visitors per process (default: 8)")
+    parser.add_argument('--requests', type=int, default=400, help="product pages per visitor (default: 400)")
+    parser.add_argument('--processes', type=int, default=1, help="forked worker processes (default: 1)")
+    parser.add_argument('--products', type=int, default=2000, help="products in the catalog (default: 2000)")
+    parser.add_argument('--runs', type=int, default=2, help="runs per mode (default: 2)")
+    args = parser.parse_args()
+
+    print(f"{args.processes} process(es) x {args.threads} threads x {args.requests} product pages, "
+          f"{args.runs} runs per mode\n")
+    print(f"{'mode':<18}{'req/s':>24}{'pages':>10}{'views stored':>16}")
+    lost = False
+    for mode in MODES:
+        rates, served, stored = [], 0, 0
+        for _ in range(args.runs):
+            rate, served, stored = run(mode, args)
+            rates.append(f"{rate:.0f}")
+            if mode != 'disabled' and stored != served:
+                lost = True
+        print(f"{mode:<18}{' / '.join(rates):>24}{served:>10}{stored:>16}")
+
+    if lost:
+        print("❌ Some views were not stored")
+        sys.exit(1)
+    print("✅ Every view was stored")
+
+
+if __name__ == "__main__":
+    main()
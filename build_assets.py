@@ -0,0 +1,23 @@
+"""
+Build fingerprinted, precompressed static assets into static/dist
+Run after changing CSS/JS and before starting the app
+"""
+
+import os
+
+from utils.assets import build_assets, clean_assets
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+
+def main():
+    print("Building static assets...")
+    clean_assets(STATIC_FOLDER)
+    manifest = build_assets(STATIC_FOLDER)
+    for asset, hashed in manifest.items():
+        print(f"  {asset} -> dist/{hashed}")
+    print(f"✓ Built {len(manifest)} assets")
+
+
+if __name__ == "__main__":
+    main()
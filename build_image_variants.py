@@ -0,0 +1,31 @@
+"""
+Generate resized image variants for products that don't have them yet
+Run once after upgrading (images uploaded before variants existed), and
+whenever a worker restart may have dropped queued jobs
+"""
+
+import argparse
+
+from app import create_app
+from utils.images import build_missing_variants
+
+app = create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate missing product image variants")
+    parser.add_argument('--limit', type=int, help="process at most this many products (default: all)")
+    args = parser.parse_args()
+
+    print("Generating missing image variants...")
+    stats = build_missing_variants(app, limit=args.limit)
+
+    print("\n" + "="*50)
+    print(f"Products without variants:  {stats['products']}")
+    print(f"Variants generated:         {stats['ready']}")
+    print(f"Failed:                     {stats['failed']}")
+    print("="*50)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
-from wtforms import StringField, PasswordField, TextAreaField, FloatField, SelectField, BooleanField
-from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError, Optional
+from flask_wtf.file import FileField, FileAllowed, FileRequired
+from wtforms import StringField, PasswordField, TextAreaField, FloatField, IntegerField, SelectField, BooleanField, HiddenField
+from wtforms.widgets import HiddenInput
+from wtforms.validators import DataRequired, InputRequired, Email, Length, EqualTo, NumberRange, ValidationError, Optional
 from models import User
 
 class LoginForm(FlaskForm):
@@ -35,6 +36,8 @@ class ProductForm(FlaskForm):
     name = StringField('Product Name', validators=[DataRequired(), Length(max=100)])
     description = TextAreaField('Description', validators=[DataRequired()])
     price = FloatField('Price', validators=[DataRequired()])
+    stock = IntegerField('Stock', default=0, validators=[InputRequired(), NumberRange(min=0)])
+    stock_loaded = IntegerField(widget=HiddenInput(), validators=[Optional()])  # Stock when the edit form was opened
     image = FileField('Product Image', validators=[
         Optional(),
         FileAllowed(['jpg', 'jpeg', 'png'], 'Only JPG, JPEG, and PNG images are allowed!')
@@ -42,6 +45,18 @@ class ProductForm(FlaskForm):
     category_id = SelectField('Category', coerce=int, validators=[DataRequired()])
 
 
+class ProductImportForm(FlaskForm):
+    """Form for bulk importing products from CSV in admin panel"""
+    csv_file = FileField('Products CSV', validators=[
+        FileRequired(),
+        FileAllowed(['csv'], 'Only CSV files are allowed!')
+    ])
+    images_zip = FileField('Images ZIP (optional)', validators=[
+        Optional(),
+        FileAllowed(['zip'], 'Only ZIP archives are allowed!')
+    ])
+
+
 class CategoryForm(FlaskForm):
     """Form for adding/editing categories in admin panel"""
     name = StringField('Category Name', validators=[DataRequired(), Length(max=50)])
@@ -53,3 +68,4 @@ class CheckoutForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Email()])
     phone = StringField('Phone Number', validators=[DataRequired(), Length(min=10, max=20)])
     address = TextAreaField('Delivery Address', validators=[DataRequired(), Length(min=10, max=500)])
+    checkout_token = HiddenField(validators=[DataRequired(), Length(max=64)])
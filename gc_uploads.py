@@ -0,0 +1,53 @@
+"""
+Garbage-collect orphaned product image uploads
+Safe to run while the app is serving; schedule it e.g. daily with cron
+"""
+
+import argparse
+
+from app import create_app
+from utils.upload_gc import collect_orphans, DEFAULT_GRACE_PERIOD
+
+app = create_app()
+
+
+def format_bytes(size):
+    """Human-readable byte count"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove uploaded images no product references")
+    parser.add_argument('--grace-hours', type=float, default=DEFAULT_GRACE_PERIOD / 3600,
+                        help="only touch files older than this many hours (default: 24)")
+    parser.add_argument('--quarantine', action='store_true',
+                        help="move orphans to the quarantine area instead of deleting them")
+    parser.add_argument('--dry-run', action='store_true', help="report orphans without removing them")
+    args = parser.parse_args()
+
+    print("Scanning uploads for orphaned images...")
+    stats = collect_orphans(
+        app,
+        grace_period=args.grace_hours * 3600,
+        quarantine=args.quarantine,
+        dry_run=args.dry_run
+    )
+
+    action = "Would reclaim" if args.dry_run else ("Quarantined" if args.quarantine else "Reclaimed")
+    print("\n" + "="*50)
+    print(f"Files scanned:        {stats['scanned']}")
+    print(f"Orphans found:        {stats['orphans']}")
+    print(f"Too recent to touch:  {stats['skipped_recent']}")
+    if not args.dry_run:
+        print(f"Removed:              {stats['removed']}")
+        print(f"Errors:               {stats['errors']}")
+    print(f"{action}: {format_bytes(stats['bytes_reclaimed'])}")
+    print("="*50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Gunicorn configuration
+Loaded automatically by `gunicorn "app:create_app()"` from the project root
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+# Threaded workers: while some threads wait on a password hash (run in the
+# worker's hashing pool, see utils/passwords.py) or on a slow client reading a
+# streamed page, the others keep serving. Keep PASSWORD_HASH_MAX_PENDING below
+# threads so hashing can never occupy every thread of a worker.
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+
+# Import and configure the app once in the master; workers fork from it with
+# modules, templates and the asset manifest already loaded
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master so workers never share a socket"""
+    from models import db
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """Write the worker's pending product view counts and finish its email batches before it goes away"""
+    from utils.view_counter import get_view_counter
+    from utils.email_service import wait_for_email_batches
+    app = server.app.wsgi()
+    counter = get_view_counter(app)
+    if counter is not None:
+        counter.close()
+    wait_for_email_batches(app)
+
+
+def when_ready(server):
+    """Compile templates and build the suggestion index before workers are forked so they start warm"""
+    from utils.template_cache import warm_templates
+    from utils.suggest import warm_suggest_index
+    app = server.app.wsgi()
+    warm_templates(app)
+    warm_suggest_index(app)
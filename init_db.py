@@ -3,10 +3,12 @@ Database initialization script for SecretsClan
 Run this script to populate the database with dummy data
 """
 
-from app import app
+from app import create_app
 from models import db, User, Category, Product
 from werkzeug.security import generate_password_hash
 
+app = create_app()
+
 def init_database():
     """Initialize database with dummy data"""
     with app.app_context():
@@ -200,6 +202,7 @@ def init_database():
                 name=product_data["name"],
                 description=product_data["description"],
                 price=product_data["price"],
+                stock=50,
                 image_filename=None,  # Changed from image_url - will use placeholder
                 category_id=category.id
             )
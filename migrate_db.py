@@ -3,8 +3,166 @@ Migration script to update existing database from image_url to image_filename
 Run this ONLY if you have an existing database with data
 """
 
-from app import app
-from models import db, Product
+import argparse
+import sys
+
+from app import create_app
+from models import db, Product, Order, OrderItem, normalize_search_text, phone_digits
+
+app = create_app()
+
+# Columns added after the initial schema: (table, column, DDL type and default)
+NEW_COLUMNS = [
+    ('product', 'stock', 'INTEGER NOT NULL DEFAULT 0'),
+    ('order_item', 'product_id', 'INTEGER REFERENCES product(id) ON DELETE SET NULL'),
+    ('order', 'checkout_token', 'VARCHAR(64)'),
+    ('product', 'image_variants_ready', 'BOOLEAN NOT NULL DEFAULT 0'),
+    ('order', 'name_search', 'VARCHAR(100)'),
+    ('order', 'email_search', 'VARCHAR(120)'),
+    ('order', 'phone_digits', 'VARCHAR(20)'),
+    ('product', 'units_sold', 'INTEGER NOT NULL DEFAULT 0'),
+    ('product', 'sales_score', 'FLOAT NOT NULL DEFAULT 0'),
+    ('product', 'view_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ('order_item', 'category_id', 'INTEGER'),
+]
+
+# Indexes for the columns above: (index name, table, columns, unique)
+NEW_INDEXES = [
+    ('ix_order_checkout_token', 'order', ['checkout_token'], True),
+    ('ix_product_image_filename', 'product', ['image_filename'], False),
+    ('ix_product_price', 'product', ['price'], False),
+    ('ix_product_category_id_price', 'product', ['category_id', 'price'], False),
+    ('ix_order_name_search', 'order', ['name_search'], False),
+    ('ix_order_email_search', 'order', ['email_search'], False),
+    ('ix_order_phone_digits', 'order', ['phone_digits'], False),
+    ('ix_order_order_date', 'order', ['order_date'], False),
+    ('ix_order_status_order_date', 'order', ['status', 'order_date'], False),
+    ('ix_order_item_order_id', 'order_item', ['order_id'], False),
+    ('ix_order_item_product_id', 'order_item', ['product_id'], False),
+    ('ix_product_sales_score', 'product', ['sales_score'], False),
+    ('ix_product_category_id_sales_score', 'product', ['category_id', 'sales_score'], False),
+]
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def add_missing_columns(initial_stock=None):
+    """
+    Add columns introduced by newer versions of the models to an existing database.
+
+    Products that predate stock tracking get initial_stock units each; the
+    caller must choose it, since no default is right for every store (0 would
+    stop all sales until every product is edited). Returns False, changing
+    nothing, when the stock column is missing and initial_stock is None.
+    """
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        if (inspector.has_table('product')
+                and 'stock' not in {c['name'] for c in inspector.get_columns('product')}
+                and initial_stock is None):
+            print("Products have no stock column yet. Re-run with --initial-stock N to give")
+            print("every existing product N units (set real counts in the admin panel afterwards).")
+            return False
+        
+        # Create any brand-new tables first
+        db.create_all()
+        
+        inspector = db.inspect(db.engine)
+        for table, column, ddl in NEW_COLUMNS:
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            if column in existing:
+                continue
+            print(f"Adding column {table}.{column}...")
+            db.session.execute(db.text(f'ALTER TABLE "{table}" ADD COLUMN {column} {ddl}'))
+            if (table, column) == ('product', 'stock'):
+                print(f"Setting stock of existing products to {initial_stock}...")
+                db.session.execute(db.update(Product).values(stock=initial_stock))
+            elif (table, column) == ('product', 'image_variants_ready'):
+                print("Existing product images have no resized variants; run build_image_variants.py next.")
+        
+        for name, table, columns, unique in NEW_INDEXES:
+            existing = {i['name'] for i in inspector.get_indexes(table)}
+            if name in existing:
+                continue
+            print(f"Creating index {name}...")
+            column_list = ', '.join(columns)
+            db.session.execute(db.text(
+                f'CREATE {"UNIQUE " if unique else ""}INDEX {name} ON "{table}" ({column_list})'
+            ))
+        db.session.commit()
+        backfill_order_search_columns()
+        link_order_items_to_products()
+        record_order_item_categories()
+        print("Schema is up to date.")
+        return True
+
+
+def backfill_order_search_columns():
+    """Fill the normalized search columns of orders placed before they existed"""
+    filled = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Order.id, Order.name, Order.email, Order.phone)
+            .where(Order.name_search.is_(None))
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        db.session.execute(db.update(Order), [
+            {'id': id, 'name_search': normalize_search_text(name), 'email_search': normalize_search_text(email),
+             'phone_digits': phone_digits(phone)}
+            for id, name, email, phone in rows
+        ])
+        db.session.commit()
+        filled += len(rows)
+    if filled:
+        print(f"Filled search columns for {filled} orders.")
+
+
+def link_order_items_to_products():
+    """Set product_id on order items recorded before it existed, matching them by product name"""
+    ids_by_name = {}
+    for id, name in db.session.execute(db.select(Product.id, Product.name)):
+        ids_by_name[name] = None if name in ids_by_name else id  # Ambiguous names stay unlinked
+    
+    linked, last_id = 0, 0
+    while True:
+        rows = db.session.execute(
+            db.select(OrderItem.id, OrderItem.product_name)
+            .where(OrderItem.product_id.is_(None), OrderItem.id > last_id)
+            .order_by(OrderItem.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        updates = [{'id': id, 'product_id': ids_by_name[name]} for id, name in rows if ids_by_name.get(name)]
+        if updates:
+            db.session.execute(db.update(OrderItem), updates)
+            db.session.commit()
+            linked += len(updates)
+    if linked:
+        print(f"Linked {linked} order items to their products.")
+
+
+def record_order_item_categories():
+    """
+    Give order items recorded before category_id existed their product's
+    current category, the closest record of where they were sold.
+    Run backfill_sales.py afterwards so the category rollups match.
+    """
+    order_item, product = OrderItem.__table__, Product.__table__
+    result = db.session.execute(
+        db.update(order_item)
+        .where(order_item.c.category_id.is_(None), order_item.c.product_id.is_not(None))
+        .values(category_id=db.select(product.c.category_id)
+                .where(product.c.id == order_item.c.product_id)
+                .scalar_subquery())
+    )
+    db.session.commit()
+    if result.rowcount:
+        print(f"Recorded categories for {result.rowcount} order items.")
+
 
 def migrate_database():
     """Migrate from image_url to image_filename column"""
@@ -33,5 +191,20 @@ def migrate_database():
             print(f"Error during migration: {e}")
             print("Please run init_db.py to create a fresh database with dummy data.")
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Bring an existing database up to the current schema")
+    parser.add_argument('--initial-stock', type=int, metavar='N',
+                        help="units of stock given to each existing product when stock tracking is "
+                             "added (required on databases without a stock column)")
+    args = parser.parse_args()
+    if args.initial_stock is not None and args.initial_stock < 0:
+        parser.error("--initial-stock must be 0 or more")
+    
+    # Columns first: the old-schema check below loads products through the current model
+    if not add_missing_columns(initial_stock=args.initial_stock):
+        sys.exit(1)
     migrate_database()
+
+
+if __name__ == "__main__":
+    main()
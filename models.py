@@ -1,10 +1,25 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import validates
 from datetime import datetime, timezone
+import re
+from utils.images import IMAGE_SIZES, variant_filename
+from utils.storage import get_storage
+from utils.passwords import get_password_hasher
 
 db = SQLAlchemy()
 
+
+def normalize_search_text(text):
+    """Lowercase and collapse whitespace, the form names and emails are indexed in for admin search"""
+    return ' '.join(text.casefold().split()) if text else text
+
+
+def phone_digits(phone):
+    """Just the digits of a phone number, so '0300-123 4567' and '03001234567' match"""
+    return re.sub(r'\D', '', phone) if phone else phone
+
+
 class User(UserMixin, db.Model):
     """User model for authentication and user management"""
     id = db.Column(db.Integer, primary_key=True)
@@ -18,11 +33,15 @@ class User(UserMixin, db.Model):
     
     def set_password(self, password):
         """Hash and set the user's password"""
-        self.password = generate_password_hash(password)
+        self.password = get_password_hasher().hash(password)
     
     def check_password(self, password):
         """Check if the provided password matches the stored hash"""
-        return check_password_hash(self.password, password)
+        return get_password_hasher().verify(self.password, password)
+    
+    def password_needs_rehash(self):
+        """Check if the stored hash predates the configured hash parameters"""
+        return get_password_hasher().needs_rehash(self.password)
     
     def __repr__(self):
         return f'<User {self.email}>'
@@ -45,19 +64,43 @@ class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    price = db.Column(db.Float, nullable=False)
-    image_filename = db.Column(db.String(200), nullable=True)  # Changed from image_url to image_filename
+    price = db.Column(db.Float, nullable=False, index=True)  # Price range filters and sorting
+    stock = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    image_filename = db.Column(db.String(200), nullable=True, index=True)  # Content-addressed; shared by identical uploads
+    image_variants_ready = db.Column(db.Boolean, nullable=False, default=False, server_default='0')  # Set by the image worker
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    units_sold = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Excludes cancelled orders
+    sales_score = db.Column(db.Float, nullable=False, default=0, server_default='0', index=True)  # Time-decayed popularity, see utils/bestsellers.py
+    view_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Written behind by utils/view_counter.py; unindexed to keep flushes cheap
     
     # Relationship with Cart
     cart_items = db.relationship('Cart', backref='product', lazy=True, cascade='all, delete-orphan')
     
-    def get_image_url(self):
-        """Get the URL for the product image"""
+    # Category pages filter and sort by price or popularity within one category
+    __table_args__ = (
+        db.Index('ix_product_category_id_price', 'category_id', 'price'),
+        db.Index('ix_product_category_id_sales_score', 'category_id', 'sales_score'),
+    )
+    
+    def get_image_url(self, size=None, fmt='jpeg'):
+        """Get the URL for the product image, optionally a resized variant ('thumb', 'detail', 'retina')"""
         if self.image_filename:
-            return f'/static/uploads/{self.image_filename}'
+            storage = get_storage()
+            if size and self.image_variants_ready:
+                return storage.url(variant_filename(self.image_filename, size, fmt))
+            return storage.url(self.image_filename)
         return '/static/uploads/placeholder.svg'
     
+    def get_image_srcset(self, fmt='jpeg'):
+        """Get a srcset attribute value listing every resized variant"""
+        if not (self.image_filename and self.image_variants_ready):
+            return ''
+        return ', '.join(f'{self.get_image_url(size, fmt)} {width}w' for size, width in IMAGE_SIZES.items())
+    
+    def in_stock(self, quantity=1):
+        """Check if the requested quantity is currently available"""
+        return (self.stock or 0) >= quantity
+    
     def __repr__(self):
         return f'<Product {self.name}>'
 
@@ -86,13 +129,37 @@ class Order(db.Model):
     address = db.Column(db.Text, nullable=False)
     total_price = db.Column(db.Float, nullable=False)
     payment_method = db.Column(db.String(50), default='COD')
-    order_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    order_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     status = db.Column(db.String(50), default='Pending')
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # Optional: link to user if logged in
+    checkout_token = db.Column(db.String(64), unique=True, index=True, nullable=True)  # Idempotency key issued by checkout()
+    
+    # Normalized copies of the contact fields for indexed admin search, kept in sync by the validators below
+    name_search = db.Column(db.String(100), nullable=True, index=True)
+    email_search = db.Column(db.String(120), nullable=True, index=True)
+    phone_digits = db.Column(db.String(20), nullable=True, index=True)
     
     # Relationship with OrderItems
     order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
+    # Admin order list filtered by status, newest first
+    __table_args__ = (db.Index('ix_order_status_order_date', 'status', 'order_date'),)
+    
+    @validates('name')
+    def _normalize_name(self, key, name):
+        self.name_search = normalize_search_text(name)
+        return name
+    
+    @validates('email')
+    def _normalize_email(self, key, email):
+        self.email_search = normalize_search_text(email)
+        return email
+    
+    @validates('phone')
+    def _normalize_phone(self, key, phone):
+        self.phone_digits = phone_digits(phone)
+        return phone
+    
     def can_be_cancelled(self):
         """Check if order can be cancelled (within 24 hours and status is Pending)"""
         if self.status != 'Pending':
@@ -100,7 +167,11 @@ class Order(db.Model):
         
         # Check if order is within 24 hours
         from datetime import timedelta
-        time_elapsed = datetime.now(timezone.utc) - self.order_date
+        order_date = self.order_date
+        if order_date.tzinfo is None:
+            # SQLite returns naive datetimes; they are stored in UTC
+            order_date = order_date.replace(tzinfo=timezone.utc)
+        time_elapsed = datetime.now(timezone.utc) - order_date
         return time_elapsed < timedelta(hours=24)
     
     def calculate_total(self):
@@ -126,7 +197,9 @@ class Order(db.Model):
 class OrderItem(db.Model):
     """OrderItem model for items in an order"""
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='SET NULL'), nullable=True, index=True)  # Used to restock on cancellation
+    category_id = db.Column(db.Integer, nullable=True)  # Product's category when sold, for sales rollups; no foreign key: history outlives categories
     product_name = db.Column(db.String(100), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False)
@@ -137,3 +210,80 @@ class OrderItem(db.Model):
     
     def __repr__(self):
         return f'<OrderItem {self.product_name} x {self.quantity}>'
+
+
+class LoginThrottle(db.Model):
+    """Sliding-window login attempt counters, shared across workers when LOGIN_THROTTLE_BACKEND=database"""
+    key = db.Column(db.String(200), primary_key=True)  # 'ip:<address>' or 'email:<address>'
+    window = db.Column(db.Integer, nullable=False, index=True)  # Index of the current fixed window
+    previous_count = db.Column(db.Integer, nullable=False, default=0)
+    current_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<LoginThrottle {self.key}>'
+
+
+class CatalogVersion(db.Model):
+    """Single-row counter bumped on every product or category write, so per-worker caches can tell they are stale"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CatalogVersion {self.version}>'
+
+
+class ProductPair(db.Model):
+    """Sparse co-occurrence matrix of non-cancelled orders, kept by build_recommendations.py for incremental refreshes"""
+    product_id = db.Column(db.Integer, primary_key=True)  # Both (a, b) and (b, a) are stored
+    related_id = db.Column(db.Integer, primary_key=True)  # related_id == product_id holds the product's own order count
+    orders = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<ProductPair {self.product_id} {self.related_id}: {self.orders}>'
+
+
+class RecommendationBuild(db.Model):
+    """One run of build_recommendations.py; the latest last_order_id is where the next refresh starts"""
+    id = db.Column(db.Integer, primary_key=True)
+    last_order_id = db.Column(db.Integer, nullable=False)  # Orders up to this id are counted in ProductPair
+    full = db.Column(db.Boolean, nullable=False, default=False)
+    finished_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    
+    def __repr__(self):
+        return f'<RecommendationBuild {self.id} through order {self.last_order_id}>'
+
+
+class ProductRecommendation(db.Model):
+    """Top products bought together with each product, derived from ProductPair by build_recommendations.py"""
+    product_id = db.Column(db.Integer, primary_key=True)  # No foreign key: rows of deleted products go on the next build
+    rank = db.Column(db.Integer, primary_key=True)  # 0 is the strongest
+    related_id = db.Column(db.Integer, nullable=False)
+    orders = db.Column(db.Integer, nullable=False)  # Orders containing both products
+    score = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self):
+        return f'<ProductRecommendation {self.product_id} #{self.rank} -> {self.related_id}>'
+
+
+class DailySales(db.Model):
+    """Orders, units and revenue per day (UTC) and order status, kept current by utils/sales_rollup.py"""
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DailySales {self.day} {self.status}>'
+
+
+class DailyCategorySales(db.Model):
+    """Units and revenue per day (UTC), order status and category; category_id 0 collects deleted products"""
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    category_id = db.Column(db.Integer, primary_key=True)  # No foreign key: history outlives deleted categories
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DailyCategorySales {self.day} {self.status} {self.category_id}>'
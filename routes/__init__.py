@@ -1,4 +1,8 @@
 """Routes package initialization"""
+from .main import main_bp
+from .auth import auth_bp
+from .admin import admin_bp
 from .orders import orders_bp
+from .assets import assets_bp
 
-__all__ = ['orders_bp']
+__all__ = ['main_bp', 'auth_bp', 'admin_bp', 'orders_bp', 'assets_bp']
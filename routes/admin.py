@@ -0,0 +1,428 @@
+"""
+Admin Blueprint
+Handles the admin dashboard and product, category and user management
+"""
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request
+from flask_login import current_user
+from functools import wraps
+from datetime import datetime
+
+from models import db, User, Category, Product
+from forms import ProductForm, ProductImportForm, CategoryForm
+from utils.images import process_product_image, variant_filenames, store_upload
+from utils.storage import get_storage
+from utils.email_service import get_mail
+from utils.streaming import stream_scalars, stream_page, count_rows
+from utils.throttle import get_login_limiter
+from utils.user_cache import get_user_cache
+from utils.suggest import index_product, unindex_product, index_category, unindex_category
+from utils.catalog import bump_catalog_version
+from utils.search_cache import get_search_cache
+from utils.view_counter import get_view_counter
+from utils.sales_rollup import sales_report
+from utils.inventory import set_stock
+
+# Create blueprint
+admin_bp = Blueprint('admin', __name__)
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+
+
+# Helper function to check allowed file extensions
+def allowed_file(filename):
+    """Check if file has an allowed extension"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+# Helper function to save an uploaded product image
+def save_image_file(file):
+    """Save an uploaded image under its content hash and return its filename"""
+    return store_upload(file, get_storage())
+
+
+# Helper function to delete image file
+def delete_image_file(filename):
+    """Delete image file and its resized variants once no product references them"""
+    if filename and filename not in ['placeholder.png', 'placeholder.svg']:
+        # Identical uploads share one blob; keep it while any product still uses it
+        if Product.query.filter_by(image_filename=filename).count() > 0:
+            return False
+        storage = get_storage()
+        try:
+            if storage.delete(filename):
+                for variant in variant_filenames(filename):
+                    storage.delete(variant)
+                return True
+        except Exception as e:
+            # Leftovers are cleaned up later by gc_uploads.py
+            current_app.logger.error(f"Error deleting image {filename}: {e}")
+            return False
+    return False
+
+
+# Admin required decorator
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin:
+            flash('You need admin privileges to access this page.', 'danger')
+            return redirect(url_for('main.index'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# ============ ADMIN ROUTES ============
+
+@admin_bp.route('/admin')
+@admin_required
+def admin_dashboard():
+    """Admin dashboard with statistics"""
+    total_users = User.query.count()
+    total_products = Product.query.count()
+    total_categories = Category.query.count()
+    
+    return render_template('admin/dashboard.html',
+                         total_users=total_users,
+                         total_products=total_products,
+                         total_categories=total_categories,
+                         login_throttle=get_login_limiter().stats,
+                         search_cache=get_search_cache(),
+                         view_counter=get_view_counter())
+
+
+SALES_REPORT_RANGES = (7, 30, 90, 365)  # Days offered on the sales page
+
+
+@admin_bp.route('/admin/sales')
+@admin_required
+def admin_sales():
+    """Sales over time, by status and by category (reads only the daily rollups)"""
+    days = request.args.get('days', 30, type=int)
+    if days not in SALES_REPORT_RANGES:
+        days = 30
+    report = sales_report(days)
+    return render_template('admin/sales.html', report=report, days=days, ranges=SALES_REPORT_RANGES)
+
+
+# -------- ADMIN PRODUCTS --------
+
+@admin_bp.route('/admin/products')
+@admin_required
+def admin_products():
+    """View all products (streamed so memory stays constant regardless of catalog size)"""
+    statement = db.select(Product).options(db.joinedload(Product.category)).order_by(Product.id)
+    return stream_page('admin/products.html',
+                       products=stream_scalars(statement),
+                       product_count=count_rows(db.select(Product)))
+
+
+@admin_bp.route('/admin/products/add', methods=['GET', 'POST'])
+@admin_required
+def admin_add_product():
+    """Add new product"""
+    form = ProductForm()
+    form.category_id.choices = [(c.id, c.name) for c in Category.query.all()]
+    
+    if form.validate_on_submit():
+        # Handle file upload
+        image_filename = None
+        if 'image' in request.files:
+            file = request.files['image']
+            if file and file.filename and allowed_file(file.filename):
+                image_filename = save_image_file(file)
+            elif file and file.filename:
+                flash('Invalid file type. Only JPG, JPEG, and PNG are allowed.', 'danger')
+                return render_template('admin/product_form.html', form=form, action='Add')
+        
+        product = Product(
+            name=form.name.data,
+            description=form.description.data,
+            price=form.price.data,
+            stock=form.stock.data,
+            image_filename=image_filename,
+            category_id=form.category_id.data
+        )
+        db.session.add(product)
+        bump_catalog_version()
+        db.session.commit()
+        index_product(product.id, product.name)
+        
+        # Resize in the background; templates use the original until variants are ready
+        if image_filename:
+            process_product_image(current_app._get_current_object(), product.id, image_filename)
+        
+        flash('Product added successfully!', 'success')
+        return redirect(url_for('admin.admin_products'))
+    
+    return render_template('admin/product_form.html', form=form, action='Add')
+
+
+@admin_bp.route('/admin/products/import', methods=['GET', 'POST'])
+@admin_required
+def admin_import_products():
+    """Bulk import products from a CSV file with an optional ZIP of images"""
+    from utils.product_import import import_products, CSV_COLUMNS
+    import zipfile
+    
+    form = ProductImportForm()
+    result = None
+    
+    if form.validate_on_submit():
+        images_zip = form.images_zip.data.stream if form.images_zip.data else None
+        try:
+            result = import_products(form.csv_file.data.stream, images_zip)
+        except (zipfile.BadZipFile, UnicodeDecodeError) as e:
+            flash(f'Could not read the uploaded files: {e}', 'danger')
+        else:
+            category = 'success' if not result['errors'] else 'warning'
+            flash(f"Imported {result['imported']} of {result['rows']} products "
+                  f"({result['rows_per_second']:.0f} rows/second).", category)
+    
+    return render_template('admin/product_import.html', form=form, result=result, columns=CSV_COLUMNS)
+
+
+@admin_bp.route('/admin/products/edit/<int:id>', methods=['GET', 'POST'])
+@admin_required
+def admin_edit_product(id):
+    """Edit existing product"""
+    product = Product.query.get_or_404(id)
+    form = ProductForm(obj=product)
+    form.category_id.choices = [(c.id, c.name) for c in Category.query.all()]
+    if not form.is_submitted():
+        form.stock_loaded.data = product.stock
+    
+    if form.validate_on_submit():
+        # Stock moves with every checkout, so only write it if the admin changed it,
+        # and only if nothing was reserved since the form was opened
+        stock_loaded = form.stock_loaded.data if form.stock_loaded.data is not None else product.stock
+        if form.stock.data != stock_loaded and not set_stock(product.id, stock_loaded, form.stock.data):
+            db.session.refresh(product)
+            form.stock.data = form.stock_loaded.data = product.stock
+            flash(f'Stock changed to {product.stock} while you were editing (orders were placed or cancelled). '
+                  f'Check the new value and save again.', 'warning')
+            return render_template('admin/product_form.html', form=form, action='Edit', product=product)
+        
+        # Handle file upload
+        new_image = None
+        old_image = product.image_filename
+        if 'image' in request.files:
+            file = request.files['image']
+            if file and file.filename and allowed_file(file.filename):
+                # Save new image
+                new_image = save_image_file(file)
+                if new_image != old_image:
+                    product.image_filename = new_image
+                    product.image_variants_ready = False
+                else:
+                    new_image = None
+            elif file and file.filename:
+                flash('Invalid file type. Only JPG, JPEG, and PNG are allowed.', 'danger')
+                return render_template('admin/product_form.html', form=form, action='Edit', product=product)
+        
+        product.name = form.name.data
+        product.description = form.description.data
+        product.price = form.price.data
+        product.category_id = form.category_id.data
+        
+        bump_catalog_version()
+        db.session.commit()
+        index_product(product.id, product.name)
+        
+        if new_image:
+            # Delete old image if no other product shares it
+            delete_image_file(old_image)
+            process_product_image(current_app._get_current_object(), product.id, new_image)
+        
+        flash('Product updated successfully!', 'success')
+        return redirect(url_for('admin.admin_products'))
+    
+    return render_template('admin/product_form.html', form=form, action='Edit', product=product)
+
+
+@admin_bp.route('/admin/products/delete/<int:id>')
+@admin_required
+def admin_delete_product(id):
+    """Delete product"""
+    product = Product.query.get_or_404(id)
+    image_filename = product.image_filename
+    
+    db.session.delete(product)
+    bump_catalog_version()
+    db.session.commit()
+    unindex_product(id)
+    
+    # Delete associated image file if no other product shares it
+    delete_image_file(image_filename)
+    flash('Product deleted successfully!', 'success')
+    return redirect(url_for('admin.admin_products'))
+
+
+# -------- ADMIN CATEGORIES --------
+
+@admin_bp.route('/admin/categories')
+@admin_required
+def admin_categories():
+    """View all categories"""
+    categories = Category.query.all()
+    return render_template('admin/categories.html', categories=categories)
+
+
+@admin_bp.route('/admin/categories/add', methods=['GET', 'POST'])
+@admin_required
+def admin_add_category():
+    """Add new category"""
+    form = CategoryForm()
+    
+    if form.validate_on_submit():
+        category = Category(name=form.name.data)
+        db.session.add(category)
+        bump_catalog_version()
+        db.session.commit()
+        index_category(category.id, category.name)
+        flash('Category added successfully!', 'success')
+        return redirect(url_for('admin.admin_categories'))
+    
+    return render_template('admin/category_form.html', form=form, action='Add')
+
+
+@admin_bp.route('/admin/categories/edit/<int:id>', methods=['GET', 'POST'])
+@admin_required
+def admin_edit_category(id):
+    """Edit existing category"""
+    category = Category.query.get_or_404(id)
+    form = CategoryForm(obj=category)
+    
+    if form.validate_on_submit():
+        category.name = form.name.data
+        bump_catalog_version()
+        db.session.commit()
+        index_category(category.id, category.name)
+        flash('Category updated successfully!', 'success')
+        return redirect(url_for('admin.admin_categories'))
+    
+    return render_template('admin/category_form.html', form=form, action='Edit')
+
+
+@admin_bp.route('/admin/categories/delete/<int:id>')
+@admin_required
+def admin_delete_category(id):
+    """Delete category"""
+    category = Category.query.get_or_404(id)
+    
+    if category.products:
+        flash('Cannot delete category with existing products.', 'danger')
+    else:
+        db.session.delete(category)
+        bump_catalog_version()
+        db.session.commit()
+        unindex_category(id)
+        flash('Category deleted successfully!', 'success')
+    
+    return redirect(url_for('admin.admin_categories'))
+
+
+# -------- ADMIN USERS --------
+
+@admin_bp.route('/admin/users')
+@admin_required
+def admin_users():
+    """View all users (streamed so memory stays constant regardless of user count)"""
+    statement = db.select(User).order_by(User.id)
+    return stream_page('admin/users.html',
+                       users=stream_scalars(statement),
+                       user_count=count_rows(statement))
+
+
+@admin_bp.route('/admin/users/delete/<int:id>')
+@admin_required
+def admin_delete_user(id):
+    """Delete user"""
+    if id == current_user.id:
+        flash('You cannot delete your own account.', 'danger')
+        return redirect(url_for('admin.admin_users'))
+    
+    user = User.query.get_or_404(id)
+    db.session.delete(user)
+    db.session.commit()
+    # Also drop any entry cached between the flush and the commit
+    get_user_cache().invalidate(id)
+    flash('User deleted successfully!', 'success')
+    return redirect(url_for('admin.admin_users'))
+
+
+# -------- ADMIN ORDERS --------
+# Admin order routes moved to routes/orders.py blueprint
+
+
+# -------- ADMIN EMAIL TEST --------
+
+@admin_bp.route('/admin/test-email')
+@admin_required
+def admin_test_email():
+    """Test email configuration by sending a test email"""
+    try:
+        from flask_mail import Message
+        
+        # Log configuration (without password)
+        print("\n" + "="*60)
+        print("📧 EMAIL CONFIGURATION TEST")
+        print("="*60)
+        print(f"MAIL_SERVER: {current_app.config.get('MAIL_SERVER')}")
+        print(f"MAIL_PORT: {current_app.config.get('MAIL_PORT')}")
+        print(f"MAIL_USE_TLS: {current_app.config.get('MAIL_USE_TLS')}")
+        print(f"MAIL_USERNAME: {current_app.config.get('MAIL_USERNAME')}")
+        print(f"MAIL_PASSWORD: {'*' * len(current_app.config.get('MAIL_PASSWORD', ''))}")
+        print(f"MAIL_DEFAULT_SENDER: {current_app.config.get('MAIL_DEFAULT_SENDER')}")
+        print(f"ADMIN_EMAIL: {current_app.config.get('ADMIN_EMAIL')}")
+        print("="*60)
+        
+        # Create test message
+        msg = Message(
+            subject='🧪 SecretsClan Email Test - Configuration Successful',
+            sender=current_app.config.get('MAIL_DEFAULT_SENDER'),
+            recipients=[current_app.config.get('ADMIN_EMAIL')]
+        )
+        
+        msg.body = f"""
+🎉 SUCCESS! Email Configuration is Working!
+
+This is a test email from SecretsClan Order Management System.
+
+CONFIGURATION DETAILS:
+---------------------
+Mail Server: {current_app.config.get('MAIL_SERVER')}
+Mail Port: {current_app.config.get('MAIL_PORT')}
+TLS Enabled: {current_app.config.get('MAIL_USE_TLS')}
+Sender: {current_app.config.get('MAIL_DEFAULT_SENDER')}
+Admin Email: {current_app.config.get('ADMIN_EMAIL')}
+
+If you received this email, your email configuration is correct and all order emails will work properly!
+
+✅ Ready to send:
+  - Order confirmations
+  - Order status updates
+  - Cancellation notifications
+
+---
+SecretsClan Store
+Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
+        """
+        
+        print("\n📤 Attempting to send test email...")
+        get_mail().send(msg)
+        print("✅ Test email sent successfully!")
+        print("="*60 + "\n")
+        
+        flash('✅ Test email sent successfully! Check your inbox at ' + current_app.config.get('ADMIN_EMAIL'), 'success')
+        
+    except Exception as e:
+        error_details = f"❌ Email test failed: {str(e)}"
+        print("\n" + error_details)
+        print("="*60 + "\n")
+        
+        import traceback
+        print(traceback.format_exc())
+        
+        flash(f'❌ Email test failed: {str(e)}. Check console for details.', 'danger')
+    
+    return redirect(url_for('admin.admin_dashboard'))
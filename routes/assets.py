@@ -0,0 +1,40 @@
+"""
+Assets Blueprint
+Serves fingerprinted static assets, preferring precompressed variants
+"""
+import mimetypes
+import os
+
+from flask import Blueprint, current_app, request, send_from_directory, abort
+
+from utils.assets import DIST_DIR
+
+# Create blueprint
+assets_bp = Blueprint('assets', __name__)
+
+ASSET_CACHE_MAX_AGE = 365 * 24 * 60 * 60  # Fingerprinted names change whenever content does
+
+# Content-Encoding -> file suffix, in order of preference
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+
+@assets_bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted asset, using a .br/.gz variant when the client accepts it"""
+    dist_folder = os.path.join(current_app.static_folder, DIST_DIR)
+    if filename.endswith(('.br', '.gz')):
+        abort(404)
+
+    encoding, served = None, filename
+    for candidate, suffix in PRECOMPRESSED:
+        if request.accept_encodings[candidate] > 0 and os.path.exists(os.path.join(dist_folder, filename + suffix)):
+            encoding, served = candidate, filename + suffix
+            break
+
+    response = send_from_directory(dist_folder, served, max_age=ASSET_CACHE_MAX_AGE,
+                                   mimetype=mimetypes.guess_type(filename)[0])
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.content_encoding = encoding
+    return response
@@ -0,0 +1,99 @@
+"""
+Auth Blueprint
+Handles login, signup and logout
+"""
+from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask_login import login_user, logout_user, login_required, current_user
+
+from models import db, User
+from forms import LoginForm, SignupForm
+from utils.passwords import PasswordHasherBusy
+from utils.throttle import get_login_limiter
+
+# Create blueprint
+auth_bp = Blueprint('auth', __name__)
+
+
+# Helper function for requests rejected while password hashing is saturated
+def server_busy(template, form):
+    """Re-render an auth form with 503 so clients back off and retry"""
+    flash('The server is busy right now. Please try again in a moment.', 'warning')
+    return render_template(template, form=form), 503, {'Retry-After': '5'}
+
+
+# ============ AUTHENTICATION ROUTES ============
+
+@auth_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """User login"""
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    
+    form = LoginForm()
+    if form.validate_on_submit():
+        limiter = get_login_limiter()
+        if not limiter.allow(request.remote_addr, form.email.data):
+            flash('Too many login attempts. Please wait a few minutes and try again.', 'danger')
+            return render_template('login.html', form=form), 429, {'Retry-After': str(limiter.retry_after())}
+        
+        user = User.query.filter_by(email=form.email.data).first()
+        
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except PasswordHasherBusy:
+            return server_busy('login.html', form)
+        
+        if valid and user.password_needs_rehash():
+            # Upgrade hashes made with older parameters while we have the plaintext
+            try:
+                user.set_password(form.password.data)
+                db.session.commit()
+            except PasswordHasherBusy:
+                pass  # The password checked out; upgrade on a later login instead
+        
+        if valid:
+            limiter.reset_email(form.email.data)
+            login_user(user)
+            flash('Login successful!', 'success')
+            next_page = request.args.get('next')
+            return redirect(next_page) if next_page else redirect(url_for('main.index'))
+        else:
+            flash('Invalid email or password.', 'danger')
+    
+    return render_template('login.html', form=form)
+
+
+@auth_bp.route('/signup', methods=['GET', 'POST'])
+def signup():
+    """User registration"""
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    
+    form = SignupForm()
+    if form.validate_on_submit():
+        user = User(
+            name=form.name.data,
+            email=form.email.data,
+            is_admin=False
+        )
+        try:
+            user.set_password(form.password.data)
+        except PasswordHasherBusy:
+            return server_busy('signup.html', form)
+        
+        db.session.add(user)
+        db.session.commit()
+        
+        flash('Account created successfully! Please log in.', 'success')
+        return redirect(url_for('auth.login'))
+    
+    return render_template('signup.html', form=form)
+
+
+@auth_bp.route('/logout')
+@login_required
+def logout():
+    """User logout"""
+    logout_user()
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('main.index'))
@@ -0,0 +1,401 @@
+"""
+Main Blueprint
+Public storefront routes: catalog, cart, checkout and uploaded images
+"""
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, session, send_from_directory, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
+import secrets
+import time
+
+from models import db, Category, Product, Cart, Order, OrderItem
+from forms import CheckoutForm
+from utils.images import is_content_addressed
+from utils.email_service import send_order_confirmation, get_mail
+from utils.inventory import reserve_stock
+from utils.sales_rollup import record_order
+from utils.bestsellers import record_product_sales, top_sellers, top_seller_ids
+from utils.recommendations import bought_together, bought_together_with_cart
+from utils.view_counter import count_view
+from utils.suggest import get_suggest_index
+from utils.facets import search_products, SORT_OPTIONS
+from utils.search_cache import normalize_query, query_cache_key
+
+# Create blueprint
+main_bp = Blueprint('main', __name__)
+
+IMAGE_CACHE_MAX_AGE = 365 * 24 * 60 * 60  # Content-addressed images never change
+
+
+# ============ PUBLIC ROUTES ============
+
+@main_bp.route('/')
+def index():
+    """Homepage showing categories and best-selling products"""
+    categories = Category.query.all()
+    products = top_sellers(6)
+    return render_template('index.html', categories=categories, products=products)
+
+
+@main_bp.route('/search')
+def search():
+    """Search for products by name or category, with category and price filters"""
+    query = request.args.get('q', '')
+    terms = normalize_query(query)  # 'Watches ', 'watches' and 'watch' search (and cache) alike
+    if terms:
+        # Search in product names and category names
+        match = db.or_(
+            Product.name.ilike(f'%{terms}%'),
+            Product.description.ilike(f'%{terms}%'),
+            Category.name.ilike(f'%{terms}%')
+        )
+        products, facets = search_products(
+            match,
+            category_id=request.args.get('category', type=int),
+            price=request.args.get('price'),
+            sort=request.args.get('sort', ''),
+            cache_key=('search', query_cache_key(terms))
+        )
+    else:
+        products, facets = [], None
+    
+    return render_template('search.html', query=query, products=products, facets=facets,
+                           sort_options=SORT_OPTIONS)
+
+
+@main_bp.route('/search/suggest')
+def search_suggest():
+    """Autocomplete suggestions for the navbar search box (JSON)"""
+    query = request.args.get('q', '').strip()[:100]
+    limit = max(1, min(request.args.get('limit', current_app.config['SUGGEST_LIMIT'], type=int), 20))
+    
+    started = time.perf_counter()
+    matches = get_suggest_index().suggest(query, limit) if query else []
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    suggestions = [
+        {
+            'type': kind,
+            'name': name,
+            'url': url_for('main.product', id=id) if kind == 'product' else url_for('main.category', name=name),
+        }
+        for kind, id, name in matches
+    ]
+    response = jsonify(query=query, suggestions=suggestions)
+    response.headers['Server-Timing'] = f'suggest;dur={elapsed_ms:.3f}'
+    response.cache_control.public = True
+    response.cache_control.max_age = 60  # Repeated keystrokes hit the browser cache
+    return response
+
+
+@main_bp.route('/category/<string:name>')
+def category(name):
+    """Display products in a specific category, with price filters"""
+    category = Category.query.filter_by(name=name).first_or_404()
+    products, facets = search_products(
+        Product.category_id == category.id,
+        price=request.args.get('price'),
+        sort=request.args.get('sort', ''),
+        cache_key=('category', category.id)
+    )
+    bestseller_ids = set(top_seller_ids(3, category.id))
+    return render_template('category.html', category=category, products=products, facets=facets,
+                           sort_options=SORT_OPTIONS, bestseller_ids=bestseller_ids)
+
+
+@main_bp.route('/product/<int:id>')
+def product(id):
+    """Display product details with products often bought together (or more from its category)"""
+    product = Product.query.get_or_404(id)
+    count_view(product.id)
+    recommended = bought_together(product.id)
+    related = recommended or (Product.query
+                              .filter(Product.category_id == product.category_id, Product.id != product.id)
+                              .order_by(Product.id).limit(3).all())
+    return render_template('product.html', product=product, related_products=related,
+                           bought_together=bool(recommended))
+
+
+@main_bp.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    """Serve product images stored by the local backend; content-addressed ones are cached forever"""
+    if not is_content_addressed(filename):
+        return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+    
+    response = send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, max_age=IMAGE_CACHE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+
+# ============ CART ROUTES ============
+
+@main_bp.route('/cart')
+@login_required
+def cart():
+    """View shopping cart"""
+    cart_items = Cart.query.filter_by(user_id=current_user.id).all()
+    total = sum(item.get_subtotal() for item in cart_items)
+    recommended = bought_together_with_cart([item.product_id for item in cart_items])
+    return render_template('cart.html', cart_items=cart_items, total=total, recommended=recommended)
+
+
+@main_bp.route('/cart/add/<int:product_id>', methods=['POST'])
+@login_required
+def add_to_cart(product_id):
+    """Add product to cart"""
+    product = Product.query.get_or_404(product_id)
+    quantity = int(request.form.get('quantity', 1))
+    
+    # Check if item already in cart
+    cart_item = Cart.query.filter_by(user_id=current_user.id, product_id=product_id).first()
+    
+    # Check stock (final reservation happens atomically in place_order)
+    in_cart = cart_item.quantity if cart_item else 0
+    if not product.in_stock(in_cart + quantity):
+        flash(f'Sorry, only {product.stock} of {product.name} left in stock.', 'warning')
+        return redirect(url_for('main.product', id=product_id))
+    
+    if cart_item:
+        cart_item.quantity += quantity
+    else:
+        cart_item = Cart(user_id=current_user.id, product_id=product_id, quantity=quantity)
+        db.session.add(cart_item)
+    
+    db.session.commit()
+    flash(f'{product.name} added to cart!', 'success')
+    return redirect(url_for('main.cart'))
+
+
+@main_bp.route('/cart/update/<int:cart_id>', methods=['POST'])
+@login_required
+def update_cart(cart_id):
+    """Update cart item quantity"""
+    cart_item = Cart.query.get_or_404(cart_id)
+    
+    if cart_item.user_id != current_user.id:
+        flash('Unauthorized action.', 'danger')
+        return redirect(url_for('main.cart'))
+    
+    quantity = int(request.form.get('quantity', 1))
+    if quantity > 0:
+        cart_item.quantity = quantity
+        db.session.commit()
+        flash('Cart updated!', 'success')
+    else:
+        db.session.delete(cart_item)
+        db.session.commit()
+        flash('Item removed from cart.', 'success')
+    
+    return redirect(url_for('main.cart'))
+
+
+@main_bp.route('/cart/remove/<int:cart_id>')
+@login_required
+def remove_from_cart(cart_id):
+    """Remove item from cart"""
+    cart_item = Cart.query.get_or_404(cart_id)
+    
+    if cart_item.user_id != current_user.id:
+        flash('Unauthorized action.', 'danger')
+        return redirect(url_for('main.cart'))
+    
+    db.session.delete(cart_item)
+    db.session.commit()
+    flash('Item removed from cart.', 'success')
+    return redirect(url_for('main.cart'))
+
+
+# ============ CHECKOUT AND ORDER ROUTES ============
+
+def send_order_emails(order, user):
+    """Send order confirmation emails to admin and customer (wrapper for email_service)"""
+    return send_order_confirmation(get_mail(), order, user)
+
+
+def get_order_for_checkout(token):
+    """Return the current user's order already placed with this checkout token, if any"""
+    return Order.query.filter_by(checkout_token=token, user_id=current_user.id).first()
+
+
+def redirect_to_order_success(order):
+    """Remember the order for the success page and redirect there"""
+    session['last_order_id'] = order.id
+    session['customer_name'] = order.name
+    return redirect(url_for('main.order_success'))
+
+
+@main_bp.route('/checkout')
+@login_required
+def checkout():
+    """Display checkout page"""
+    # Get cart items
+    cart_items = Cart.query.filter_by(user_id=current_user.id).all()
+    
+    if not cart_items:
+        flash('Your cart is empty. Add items before checking out.', 'warning')
+        return redirect(url_for('main.cart'))
+    
+    # Check if any products have been deleted
+    invalid_items = []
+    for item in cart_items:
+        if not item.product:
+            invalid_items.append(item)
+    
+    # Remove invalid items
+    if invalid_items:
+        for item in invalid_items:
+            db.session.delete(item)
+        db.session.commit()
+        flash('Some items in your cart were no longer available and have been removed.', 'warning')
+        cart_items = Cart.query.filter_by(user_id=current_user.id).all()
+        
+        if not cart_items:
+            flash('Your cart is now empty.', 'warning')
+            return redirect(url_for('main.cart'))
+    
+    # Calculate total
+    total = sum(item.get_subtotal() for item in cart_items)
+    
+    # Pre-fill form with user data
+    form = CheckoutForm()
+    if not form.is_submitted():
+        form.name.data = current_user.name
+        form.email.data = current_user.email
+    
+    # One token per checkout page; place_order() uses it to detect retries
+    form.checkout_token.data = secrets.token_urlsafe(32)
+    
+    return render_template('checkout.html', form=form, cart_items=cart_items, total=total)
+
+
+@main_bp.route('/place_order', methods=['POST'])
+@login_required
+def place_order():
+    """Process order and send confirmation emails"""
+    form = CheckoutForm()
+    
+    if form.validate_on_submit():
+        checkout_token = form.checkout_token.data
+        
+        # A double-click or retried POST returns the order already placed with this token
+        existing_order = get_order_for_checkout(checkout_token)
+        if existing_order:
+            return redirect_to_order_success(existing_order)
+        
+        # Get cart items
+        cart_items = Cart.query.filter_by(user_id=current_user.id).all()
+        
+        if not cart_items:
+            flash('Your cart is empty.', 'danger')
+            return redirect(url_for('main.cart'))
+        
+        # Calculate total
+        total = sum(item.get_subtotal() for item in cart_items)
+        
+        # Reserve stock atomically; roll back the whole order if anything is short
+        unavailable = reserve_stock(cart_items)
+        if unavailable:
+            db.session.rollback()
+            # The stock may have gone to a concurrent submission of this same checkout
+            existing_order = get_order_for_checkout(checkout_token)
+            if existing_order:
+                return redirect_to_order_success(existing_order)
+            names = [item.product.name for item in cart_items if item.product_id in unavailable]
+            flash(f'Not enough stock for: {", ".join(names)}. Please update your cart.', 'danger')
+            return redirect(url_for('main.cart'))
+        
+        # Create order
+        order = Order(
+            name=form.name.data,
+            email=form.email.data,
+            phone=form.phone.data,
+            address=form.address.data,
+            total_price=total,
+            payment_method='COD',
+            status='Pending',
+            user_id=current_user.id,
+            checkout_token=checkout_token
+        )
+        db.session.add(order)
+        try:
+            db.session.flush()  # Get order ID
+        except IntegrityError:
+            # A concurrent submission with the same token won the race
+            db.session.rollback()
+            existing_order = get_order_for_checkout(checkout_token)
+            if existing_order:
+                return redirect_to_order_success(existing_order)
+            flash('This checkout has expired. Please review your order and try again.', 'warning')
+            return redirect(url_for('main.checkout'))
+        
+        # Create order items
+        order_items = []
+        for cart_item in cart_items:
+            order_item = OrderItem(
+                order_id=order.id,
+                product_id=cart_item.product_id,
+                category_id=cart_item.product.category_id,
+                product_name=cart_item.product.name,
+                quantity=cart_item.quantity,
+                price=cart_item.product.price
+            )
+            order_items.append(order_item)
+            db.session.add(order_item)
+        
+        record_order(order, order_items)
+        record_product_sales(order_items, order.order_date)
+        
+        # Clear cart
+        for cart_item in cart_items:
+            db.session.delete(cart_item)
+        
+        db.session.commit()
+        
+        # Send emails with user object instead of order_items
+        email_sent = send_order_emails(order, current_user)
+        
+        if email_sent:
+            flash('Order placed successfully! Confirmation emails have been sent.', 'success')
+        else:
+            flash('Order placed successfully! However, there was an issue sending confirmation emails.', 'warning')
+        
+        # Store order details in session for success page
+        return redirect_to_order_success(order)
+    
+    # If form validation fails
+    flash('Please fill in all required fields correctly.', 'danger')
+    return redirect(url_for('main.checkout'))
+
+
+@main_bp.route('/order_success')
+@login_required
+def order_success():
+    """Display order success page"""
+    order_id = session.pop('last_order_id', None)
+    customer_name = session.pop('customer_name', current_user.name)
+    
+    if not order_id:
+        flash('No recent order found.', 'warning')
+        return redirect(url_for('main.index'))
+    
+    order = db.session.get(Order, order_id)
+    if not order:
+        flash('Order not found.', 'danger')
+        return redirect(url_for('main.index'))
+    
+    return render_template('order_success.html', order=order, customer_name=customer_name)
+
+
+# User order routes moved to routes/orders.py blueprint
+
+
+# ============ ERROR HANDLERS ============
+
+@main_bp.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('404.html'), 404
+
+
+@main_bp.app_errorhandler(403)
+def forbidden_error(error):
+    return render_template('403.html'), 403
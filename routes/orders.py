@@ -2,13 +2,23 @@
 Orders Blueprint
 Handles all order-related routes for both users and admin
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request, session
+from flask import Blueprint, Response, render_template, stream_with_context, redirect, url_for, flash, request
 from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
 from functools import wraps
-from datetime import datetime
+from datetime import datetime, timedelta
+import csv
+import io
+import json
 
-from models import db, Order, OrderItem, Cart
-from utils.email_service import send_order_confirmation, send_order_cancellation, send_order_status_update
+from models import db, User, Order, OrderItem
+from utils.email_service import (send_order_cancellation, send_order_status_update, get_mail,
+                                 build_order_status_updates, send_messages_in_background)
+from utils.inventory import transition_order_status, bulk_transition_order_status, BULK_TRANSITIONS
+from utils.sales_rollup import record_order_deleted
+from utils.bestsellers import record_product_sales
+from utils.streaming import stream_scalars, stream_rows, stream_page, count_rows
+from utils.order_search import order_search_condition, status_filter_condition
 
 # Create blueprint
 orders_bp = Blueprint('orders', __name__)
@@ -21,11 +31,17 @@ def admin_required(f):
     def decorated_function(*args, **kwargs):
         if not current_user.is_admin:
             flash('You do not have permission to access this page.', 'danger')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         return f(*args, **kwargs)
     return decorated_function
 
 
+def order_customer(order):
+    """Who to email about an order: the account that placed it, or a guest order's own contact details"""
+    user = db.session.get(User, order.user_id) if order.user_id else None
+    return user or order  # Both have .name and .email
+
+
 # ============ USER ORDER ROUTES ============
 
 @orders_bp.route('/my-orders')
@@ -78,16 +94,19 @@ def cancel_order(order_id):
             flash('Cannot cancel order. Cancellation is only allowed within 24 hours of order placement.', 'danger')
         return redirect(url_for('orders.order_details', order_id=order_id))
     
-    # Update order status
-    order.status = 'Cancelled'
+    # Update order status and restock items
+    if not transition_order_status(order, 'Cancelled'):
+        db.session.rollback()
+        flash('This order was updated in the meantime. Please try again.', 'warning')
+        return redirect(url_for('orders.order_details', order_id=order_id))
     db.session.commit()
     
     # Send cancellation emails
     from flask import current_app
     try:
-        mail = current_app.extensions.get('mail')
+        mail = get_mail()
         if mail:
-            email_sent = send_order_cancellation(mail, order, cancelled_by='customer')
+            email_sent = send_order_cancellation(mail, order, current_user, cancelled_by='customer')
             if email_sent:
                 flash('Order cancelled successfully. Confirmation emails have been sent.', 'success')
             else:
@@ -106,32 +125,138 @@ def cancel_order(order_id):
 @orders_bp.route('/admin/orders')
 @admin_required
 def admin_orders():
-    """View all orders with optional status filter"""
+    """View all orders with optional status filter and search (streamed so memory stays constant)"""
     status_filter = request.args.get('status', 'all')
+    search_query = request.args.get('q', '').strip()
     
-    if status_filter == 'all':
-        orders = Order.query.order_by(Order.order_date.desc()).all()
-    else:
-        orders = Order.query.filter_by(status=status_filter).order_by(Order.order_date.desc()).all()
+    statement = db.select(Order).order_by(Order.order_date.desc())
+    search_condition = order_search_condition(search_query)
+    if search_condition is not None:
+        statement = statement.where(search_condition)
+    if status_filter != 'all':
+        statement = statement.where(status_filter_condition(status_filter, searching=search_condition is not None))
     
     # Calculate total revenue from Delivered orders
     total_revenue = db.session.query(db.func.sum(Order.total_price)).filter_by(status='Delivered').scalar() or 0
     
-    # Count orders by status
-    status_counts = {
-        'Pending': Order.query.filter_by(status='Pending').count(),
-        'Processing': Order.query.filter_by(status='Processing').count(),
-        'Packed': Order.query.filter_by(status='Packed').count(),
-        'Shipped': Order.query.filter_by(status='Shipped').count(),
-        'Delivered': Order.query.filter_by(status='Delivered').count(),
-        'Cancelled': Order.query.filter_by(status='Cancelled').count(),
-    }
+    # Count orders by status in a single grouped query
+    status_counts = dict.fromkeys(['Pending', 'Processing', 'Packed', 'Shipped', 'Delivered', 'Cancelled'], 0)
+    for status, count in db.session.query(Order.status, db.func.count()).group_by(Order.status):
+        status_counts[status] = count
+    
+    if search_condition is not None:
+        order_count = count_rows(statement)  # Index lookups, so counting the matches is cheap
+    elif status_filter == 'all':
+        order_count = sum(status_counts.values())
+    else:
+        order_count = status_counts.get(status_filter, 0)
+    
+    return stream_page('admin_orders.html', 
+                       orders=stream_scalars(statement), 
+                       order_count=order_count,
+                       status_filter=status_filter,
+                       search_query=search_query,
+                       total_revenue=total_revenue,
+                       status_counts=status_counts)
+
+
+EXPORT_ORDER_COLUMNS = ['order_id', 'order_date', 'status', 'name', 'email', 'phone', 'address',
+                        'payment_method', 'total_price', 'user_id']
+EXPORT_ITEM_COLUMNS = ['product_id', 'product_name', 'quantity', 'price']
+EXPORT_CHUNK_ROWS = 500  # Rows buffered per chunk sent to the client
+BULK_STATUS_MAX_ORDERS = 500  # Orders one bulk status change may touch
+
+
+def _export_rows(status_filter, start_date, end_date):
+    """Stream flat (order, item) rows ordered by order so items of one order are adjacent"""
+    statement = (
+        db.select(
+            Order.id, Order.order_date, Order.status, Order.name, Order.email, Order.phone,
+            Order.address, Order.payment_method, Order.total_price, Order.user_id,
+            OrderItem.product_id, OrderItem.product_name, OrderItem.quantity, OrderItem.price
+        )
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .order_by(Order.id, OrderItem.id)
+    )
+    if status_filter != 'all':
+        statement = statement.where(Order.status == status_filter)
+    if start_date:
+        statement = statement.where(Order.order_date >= start_date)
+    if end_date:
+        statement = statement.where(Order.order_date < end_date + timedelta(days=1))
+    return stream_rows(statement, batch_size=1000)
+
+
+def _generate_csv(rows):
+    """One CSV line per order item (orders without items get one line with empty item columns)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_ORDER_COLUMNS + EXPORT_ITEM_COLUMNS)
+    for i, row in enumerate(rows, 1):
+        values = list(row)
+        values[1] = values[1].isoformat() if values[1] else ''
+        writer.writerow(values)
+        if i % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _generate_ndjson(rows):
+    """One JSON object per order with its items nested"""
+    def dump(order):
+        if order['order_date']:
+            order['order_date'] = order['order_date'].isoformat()
+        return json.dumps(order) + '\n'
+
+    current = None
+    chunk = []
+    for row in rows:
+        if current is None or current['order_id'] != row[0]:
+            if current is not None:
+                chunk.append(dump(current))
+                if len(chunk) >= EXPORT_CHUNK_ROWS:
+                    yield ''.join(chunk)
+                    chunk = []
+            current = dict(zip(EXPORT_ORDER_COLUMNS, row[:len(EXPORT_ORDER_COLUMNS)]))
+            current['items'] = []
+        if row.product_name is not None:
+            current['items'].append(dict(zip(EXPORT_ITEM_COLUMNS, row[len(EXPORT_ORDER_COLUMNS):])))
+    if current is not None:
+        chunk.append(dump(current))
+    yield ''.join(chunk)
+
+
+@orders_bp.route('/admin/orders/export')
+@admin_required
+def admin_export_orders():
+    """Stream orders and their items as CSV or NDJSON, filtered by status and date range"""
+    export_format = request.args.get('format', 'csv')
+    status_filter = request.args.get('status', 'all')
+    
+    try:
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start') else None
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d') if request.args.get('end') else None
+    except ValueError:
+        flash('Invalid date. Please use the YYYY-MM-DD format.', 'danger')
+        return redirect(url_for('orders.admin_orders', status=status_filter))
     
-    return render_template('admin_orders.html', 
-                         orders=orders, 
-                         status_filter=status_filter,
-                         total_revenue=total_revenue,
-                         status_counts=status_counts)
+    if export_format == 'ndjson':
+        generate, mimetype, extension = _generate_ndjson, 'application/x-ndjson', 'ndjson'
+    elif export_format == 'csv':
+        generate, mimetype, extension = _generate_csv, 'text/csv', 'csv'
+    else:
+        flash('Unsupported export format.', 'danger')
+        return redirect(url_for('orders.admin_orders', status=status_filter))
+    
+    rows = _export_rows(status_filter, start_date, end_date)
+    filename = f"orders-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return Response(
+        stream_with_context(generate(rows)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
 
 
 @orders_bp.route('/admin/orders/<int:id>')
@@ -154,15 +279,19 @@ def admin_update_order_status(id):
     valid_statuses = ['Pending', 'Processing', 'Packed', 'Shipped', 'Delivered', 'Cancelled']
     
     if new_status in valid_statuses:
-        order.status = new_status
+        # Cancelling restocks items; reopening a cancelled order reserves them again
+        if not transition_order_status(order, new_status):
+            db.session.rollback()
+            flash('Could not update status: the order changed in the meantime or items are out of stock.', 'danger')
+            return redirect(url_for('orders.admin_order_details', id=id))
         db.session.commit()
         
         # Send status update email to customer
         from flask import current_app
         try:
-            mail = current_app.extensions.get('mail')
+            mail = get_mail()
             if mail and new_status != old_status:
-                email_sent = send_order_status_update(mail, order, old_status)
+                email_sent = send_order_status_update(mail, order, order_customer(order), old_status)
                 if email_sent:
                     flash(f'Order status updated to {new_status}. Customer has been notified via email.', 'success')
                 else:
@@ -178,12 +307,64 @@ def admin_update_order_status(id):
     return redirect(url_for('orders.admin_order_details', id=id))
 
 
+@orders_bp.route('/admin/orders/bulk_status', methods=['POST'])
+@admin_required
+def admin_bulk_update_order_status():
+    """Move the selected orders to a new status in one transaction and email their customers in one batch"""
+    from flask import current_app
+    new_status = request.form.get('status')
+    order_ids = sorted(set(request.form.getlist('order_ids', type=int)))
+    back = redirect(url_for('orders.admin_orders', status=request.form.get('status_filter', 'all'),
+                            q=request.form.get('q') or None))
+    
+    if new_status not in BULK_TRANSITIONS:
+        flash('Invalid status.', 'danger')
+        return back
+    if not order_ids:
+        flash('Select the orders to update first.', 'warning')
+        return back
+    if len(order_ids) > BULK_STATUS_MAX_ORDERS:
+        flash(f'Update at most {BULK_STATUS_MAX_ORDERS} orders at a time.', 'warning')
+        return back
+    
+    orders = (Order.query.options(selectinload(Order.order_items))
+              .filter(Order.id.in_(order_ids)).order_by(Order.id).all())
+    changes = bulk_transition_order_status(orders, new_status)
+    if changes is None:
+        db.session.rollback()
+        flash('Some of the selected orders were updated in the meantime. Please review them and try again.', 'danger')
+        return back
+    
+    # Build the emails before committing expires the orders
+    user_ids = {order.user_id for order, _ in changes if order.user_id}
+    users = {user.id: user for user in User.query.filter(User.id.in_(user_ids))} if user_ids else {}
+    messages = build_order_status_updates(
+        [(order, users.get(order.user_id) or order, old_status) for order, old_status in changes]
+    )
+    db.session.commit()
+    
+    if messages:
+        send_messages_in_background(current_app._get_current_object(), messages)
+    
+    skipped = len(order_ids) - len(changes)
+    message = f'{len(changes)} order(s) marked {new_status}.'
+    if messages:
+        message += ' Customers are being notified by email.'
+    if skipped:
+        message += f' {skipped} skipped: they cannot move to {new_status} from their current status.'
+    flash(message, 'success' if changes else 'warning')
+    return back
+
+
 @orders_bp.route('/admin/orders/delete/<int:id>')
 @admin_required
 def admin_delete_order(id):
     """Delete order and its items"""
     order = Order.query.get_or_404(id)
     
+    record_order_deleted(order)
+    if order.status != 'Cancelled':
+        record_product_sales(order.order_items, order.order_date, sign=-1)
     # OrderItems will be automatically deleted due to cascade='all, delete-orphan'
     db.session.delete(order)
     db.session.commit()
@@ -0,0 +1,90 @@
+/**
+ * Search Suggestions
+ * Shows autocomplete suggestions under the navbar search box as the user types
+ */
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('input[data-suggest-url]').forEach(initializeSuggestions);
+});
+
+/**
+ * Attach a suggestion dropdown to a search input
+ */
+function initializeSuggestions(input) {
+    const menu = document.createElement('ul');
+    menu.className = 'dropdown-menu w-100';
+    menu.style.top = '100%';
+    menu.style.left = '0';
+    input.parentElement.classList.add('position-relative');
+    input.insertAdjacentElement('afterend', menu);
+    input.setAttribute('autocomplete', 'off');
+
+    let timer = null;
+    let controller = null;
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (!query) {
+            hideSuggestions(menu);
+            return;
+        }
+        // Wait for a pause in typing before asking the server
+        timer = setTimeout(function() {
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            fetch(input.dataset.suggestUrl + '?q=' + encodeURIComponent(query), { signal: controller.signal })
+                .then(response => response.json())
+                .then(data => renderSuggestions(menu, data.suggestions))
+                .catch(() => {});
+        }, 150);
+    });
+
+    input.addEventListener('keydown', function(event) {
+        if (event.key === 'Escape') {
+            hideSuggestions(menu);
+        }
+    });
+
+    document.addEventListener('click', function(event) {
+        if (!menu.contains(event.target) && event.target !== input) {
+            hideSuggestions(menu);
+        }
+    });
+}
+
+/**
+ * Fill the dropdown with suggestion links
+ */
+function renderSuggestions(menu, suggestions) {
+    menu.innerHTML = '';
+    if (!suggestions.length) {
+        hideSuggestions(menu);
+        return;
+    }
+
+    suggestions.forEach(function(suggestion) {
+        const link = document.createElement('a');
+        link.className = 'dropdown-item';
+        link.href = suggestion.url;
+
+        const icon = document.createElement('i');
+        icon.className = suggestion.type === 'category' ? 'bi bi-tag me-2' : 'bi bi-search me-2';
+        link.appendChild(icon);
+        link.appendChild(document.createTextNode(suggestion.name));
+
+        const item = document.createElement('li');
+        item.appendChild(link);
+        menu.appendChild(item);
+    });
+    menu.classList.add('show');
+}
+
+/**
+ * Close the dropdown
+ */
+function hideSuggestions(menu) {
+    menu.classList.remove('show');
+}
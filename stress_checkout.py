@@ -0,0 +1,127 @@
+"""
+Stress test for stock reservation: many customers check out the same product
+at once, and the store must never sell more units than it had. Also reports
+checkout throughput and latency.
+Runs against a throwaway database (a temporary SQLite file unless --database
+is given); never point it at a live store.
+"""
+
+import argparse
+import math
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from app import create_app
+from models import db, User, Category, Product, Order, OrderItem
+
+CHECKOUT = {'name': 'Stress Test', 'email': 'stress@example.com', 'phone': '0300 1234567',
+            'address': '1 Test Street, Test City'}
+
+
+def setup_store(app, customers, stock):
+    """Create the customers and one product with stock units; returns (user ids, product id)"""
+    with app.app_context():
+        db.create_all()
+        category = Category(name='Stress Test')
+        product = Product(name='Limited Edition', description='Stress test product', price=10.0,
+                          stock=stock, category=category)
+        users = [User(name=f'Customer {i}', email=f'stress{i}@example.com', password='stress-test')
+                 for i in range(customers)]
+        db.session.add_all([category, product, *users])
+        db.session.commit()
+        return [user.id for user in users], product.id
+
+
+def prepare_checkout(app, user_id, product_id):
+    """A logged-in test client with one unit in its cart, ready to place the order"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    client.post(f'/cart/add/{product_id}', data={'quantity': 1})
+    return client
+
+
+def percentile(values, pct):
+    """The pct-th percentile of values (nearest rank)"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * pct / 100) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that concurrent checkouts never oversell stock")
+    parser.add_argument('--customers', type=int, default=20, help="parallel checkouts (default: 20)")
+    parser.add_argument('--stock', type=int, default=3, help="units of the product on sale (default: 3)")
+    parser.add_argument('--database', help="SQLAlchemy URL of an empty database (default: a temporary SQLite file)")
+    args = parser.parse_args()
+
+    database = args.database or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stress.db')}"
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database, 'TESTING': True, 'WTF_CSRF_ENABLED': False,
+                      'MAIL_SUPPRESS_SEND': True, 'VIEW_COUNTING': False})
+    user_ids, product_id = setup_store(app, args.customers, args.stock)
+    clients = [prepare_checkout(app, user_id, product_id) for user_id in user_ids]
+
+    print(f"Placing {args.customers} orders at once for {args.stock} units...")
+    start = threading.Barrier(len(clients) + 1)
+    outcomes = Counter()
+    latencies = []
+    lock = threading.Lock()
+
+    def checkout(client):
+        start.wait()
+        started = time.perf_counter()
+        try:
+            response = client.post('/place_order', data={**CHECKOUT, 'checkout_token': secrets.token_urlsafe(32)})
+            if response.status_code != 302 or response.location is None:
+                outcome = f'failed ({response.status_code})'
+            else:
+                outcome = 'order placed' if '/order_success' in response.location else 'refused'
+        except Exception as e:
+            outcome = f'failed ({type(e).__name__})'
+        with lock:
+            outcomes[outcome] += 1
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=checkout, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        stock_left = db.session.get(Product, product_id).stock
+        orders = db.session.execute(db.select(db.func.count(Order.id))).scalar()
+        units_sold = db.session.execute(db.select(db.func.coalesce(db.func.sum(OrderItem.quantity), 0))).scalar()
+
+    print("\n" + "="*50)
+    for outcome, count in sorted(outcomes.items()):
+        print(f"{outcome.capitalize() + ':':<17}{count}")
+    print(f"Orders stored:   {orders}")
+    print(f"Units sold:      {units_sold}")
+    print(f"Stock left:      {stock_left}")
+    print(f"Time:            {elapsed:.2f}s ({len(latencies) / elapsed:.1f} checkouts/s, "
+          f"{outcomes['order placed'] / elapsed:.1f} orders/s)")
+    print(f"Latency:         p50 {percentile(latencies, 50) * 1000:.0f}ms, "
+          f"p95 {percentile(latencies, 95) * 1000:.0f}ms, max {max(latencies) * 1000:.0f}ms")
+    print("="*50)
+
+    failures = sum(count for outcome, count in outcomes.items() if outcome.startswith('failed'))
+    if failures:
+        print(f"❌ {failures} checkouts failed")
+        sys.exit(1)
+    if stock_left < 0 or units_sold + stock_left != args.stock or units_sold != min(args.stock, args.customers):
+        print("❌ Stock and orders don't add up")
+        sys.exit(1)
+    print("✅ No overselling")
+
+
+if __name__ == "__main__":
+    main()
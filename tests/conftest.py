@@ -0,0 +1,47 @@
+"""
+Shared fixtures: an app on a throwaway SQLite database, a client, and a way
+to log that client in.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}", 'TESTING': True,
+                      'WTF_CSRF_ENABLED': False, 'MAIL_SUPPRESS_SEND': True, 'VIEW_COUNTING': False,
+                      'PASSWORD_HASH_WORKERS': 0, 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000'})
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(app, client):
+    """login(is_admin=False) creates a user and logs the client in as them"""
+    def login(is_admin=False):
+        with app.app_context():
+            user = User(name='Test User', email='test@example.com', password='test-password', is_admin=is_admin)
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        return user_id
+    return login
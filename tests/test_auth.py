@@ -0,0 +1,48 @@
+"""Login and password hashing"""
+from werkzeug.security import generate_password_hash
+
+from models import db, User
+from utils.passwords import PasswordHasher, PasswordHasherBusy, get_password_hasher
+
+
+def add_user(app, password, method):
+    with app.app_context():
+        user = User(name='Old Hash', email='old@example.com', password='unused')
+        user.password = generate_password_hash(password, method)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def test_login_succeeds_when_rehash_is_busy(app, client, monkeypatch):
+    user_id = add_user(app, 'secret-password', 'pbkdf2:sha256:500')
+
+    def busy(password):
+        raise PasswordHasherBusy('Too many password operations in progress')
+    monkeypatch.setattr(get_password_hasher(app), 'hash', busy)
+
+    response = client.post('/login', data={'email': 'old@example.com', 'password': 'secret-password'})
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        assert session['_user_id'] == str(user_id)
+    with app.app_context():
+        assert db.session.get(User, user_id).password.startswith('pbkdf2:sha256:500$')
+
+
+def test_login_upgrades_old_hash(app, client):
+    user_id = add_user(app, 'secret-password', 'pbkdf2:sha256:500')
+
+    response = client.post('/login', data={'email': 'old@example.com', 'password': 'secret-password'})
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.get(User, user_id).password.startswith('pbkdf2:sha256:1000$')
+
+
+def test_process_pool_hashes_and_verifies():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=1)
+    try:
+        password_hash = hasher.hash('secret-password')
+        assert hasher.verify(password_hash, 'secret-password')
+        assert not hasher.verify(password_hash, 'wrong-password')
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,39 @@
+"""Best-seller counters"""
+from datetime import datetime
+
+import pytest
+
+from models import db, Category, Product, Order, OrderItem
+from utils.bestsellers import record_product_sales, backfill_product_sales
+
+
+def place_order(product, quantity, order_date, status='Pending'):
+    order = Order(name='Test', email='test@example.com', phone='0300 1234567', address='1 Test Street',
+                  total_price=product.price * quantity, order_date=order_date, status=status)
+    order.order_items.append(OrderItem(product_id=product.id, product_name=product.name,
+                                       quantity=quantity, price=product.price))
+    db.session.add(order)
+    db.session.flush()
+    if status != 'Cancelled':
+        record_product_sales(order.order_items, order.order_date)
+    return order
+
+
+def test_backfill_matches_live_counters(app):
+    with app.app_context():
+        product = Product(name='Hoodie', description='Warm', price=50.0, stock=100, category=Category(name='Tops'))
+        db.session.add(product)
+        db.session.flush()
+        # Same day, hours apart: the backfill must weight each order at its own time, not the day's midday
+        place_order(product, 2, datetime(2026, 3, 1, 0, 30))
+        place_order(product, 1, datetime(2026, 3, 1, 23, 45))
+        place_order(product, 3, datetime(2026, 4, 2, 9, 0))
+        place_order(product, 5, datetime(2026, 4, 3, 9, 0), status='Cancelled')
+        db.session.commit()
+        db.session.refresh(product)
+        live = (product.units_sold, product.sales_score)
+
+        assert backfill_product_sales() == 1
+        db.session.refresh(product)
+        assert product.units_sold == live[0] == 6
+        assert product.sales_score == pytest.approx(live[1], rel=1e-12)
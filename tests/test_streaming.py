@@ -0,0 +1,11 @@
+"""Streamed admin pages"""
+
+
+def test_flash_on_streamed_page_is_shown_once(client, login):
+    login(is_admin=True)
+
+    response = client.post('/admin/orders/bulk_status', data={'status': 'Bogus'}, follow_redirects=True)
+    assert response.request.path == '/admin/orders'
+    assert b'Invalid status.' in response.get_data()
+
+    assert b'Invalid status.' not in client.get('/admin').get_data()
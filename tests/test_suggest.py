@@ -0,0 +1,23 @@
+"""Search suggestions"""
+from utils.suggest import SuggestIndex
+
+
+def make_index():
+    index = SuggestIndex()
+    index.bulk_load([('category', 1, 'Hoodies'), ('category', 2, 'T-Shirts'),
+                     ('product', 1, 'Black Hoodie'), ('product', 2, 'Oversized Sweatshirt')])
+    return index
+
+
+def test_two_typos_on_the_word_side():
+    # hoddie -> hoodies: one substitution plus the missing s
+    assert ('category', 1, 'Hoodies') in make_index().suggest('hoddie')
+
+
+def test_incremental_updates_match_bulk_load():
+    index = SuggestIndex()
+    index.add('category', 1, 'Hoodies')
+    assert ('category', 1, 'Hoodies') in index.suggest('hoddie')
+    index.remove('category', 1)
+    assert index.suggest('hoddie') == []
+    assert index._deletes == {}
@@ -0,0 +1,105 @@
+"""
+Static Asset Pipeline
+Fingerprints CSS/JS by content hash and writes gzip and brotli variants so
+they can be served precompressed and cached forever
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+from flask import url_for
+
+logger = logging.getLogger(__name__)
+
+# Assets referenced from templates, relative to the static folder
+ASSETS = [
+    'css/style.css',
+    'js/theme-toggle.js',
+    'js/search-suggest.js',
+]
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+
+def _write_atomic(path, data):
+    """Write bytes to path via a temporary file so readers never see a partial asset"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_assets(static_folder, assets=ASSETS):
+    """
+    Fingerprint and precompress assets into static/dist.
+
+    Each asset is copied to ``<name>.<hash>.<ext>`` alongside ``.gz`` and
+    ``.br`` variants (brotli only if the Brotli package is installed), and a
+    manifest mapping logical names to fingerprinted ones is written last.
+    Returns the manifest.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        logger.warning("Brotli is not installed; only gzip variants will be written")
+
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+
+    for asset in assets:
+        with open(os.path.join(static_folder, asset), 'rb') as f:
+            content = f.read()
+
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        stem, ext = os.path.splitext(asset)
+        hashed = f"{stem}.{digest}{ext}"
+        target = os.path.join(dist_folder, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        _write_atomic(target, content)
+        _write_atomic(f"{target}.gz", gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli:
+            _write_atomic(f"{target}.br", brotli.compress(content, quality=11))
+
+        manifest[asset] = hashed
+
+    _write_atomic(os.path.join(dist_folder, MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+def clean_assets(static_folder):
+    """Remove all built assets"""
+    shutil.rmtree(os.path.join(static_folder, DIST_DIR), ignore_errors=True)
+
+
+def load_manifest(static_folder):
+    """Load the asset manifest, or an empty one if assets have not been built"""
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def init_assets(app):
+    """Load the manifest and expose asset_url() to templates"""
+    manifest = load_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+    if not manifest:
+        logger.info("No asset manifest found; serving unfingerprinted static files (run build_assets.py)")
+
+    def asset_url(filename):
+        """url_for('static', ...) replacement that resolves fingerprinted, precompressed assets"""
+        hashed = manifest.get(filename)
+        if hashed:
+            return url_for('assets.asset', filename=hashed)
+        return url_for('static', filename=filename)
+
+    app.jinja_env.globals['asset_url'] = asset_url
+    return manifest
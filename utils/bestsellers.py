@@ -0,0 +1,148 @@
+"""
+Best Sellers
+Per-product sales counters with a time-decayed score, updated with each
+order, and cached top-seller lists for the storefront
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+import threading
+import time
+
+from flask import current_app
+
+from models import db, Order, OrderItem, Product
+from utils.catalog import catalog_version
+from utils.facets import products_by_id
+
+SCORE_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)  # Weights double every half-life from here
+
+
+def sale_weight(when, half_life_days=None):
+    """
+    Score added by one unit sold at when.
+
+    Rather than decaying every product's score as time passes, later sales
+    weigh more: a unit sold half_life_days later counts twice as much. All
+    scores would decay by the same factor, so ranking by the stored score is
+    the same as ranking by the decayed one, and a sale can be taken back
+    exactly by subtracting its weight. Weights stay well inside float range
+    for a few hundred half-lives after SCORE_EPOCH; moving the epoch forward
+    and re-running the backfill rescales every score.
+    """
+    if half_life_days is None:
+        half_life_days = current_app.config['BESTSELLER_HALF_LIFE_DAYS']
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)  # SQLite returns naive datetimes; they are stored in UTC
+    days = (when - SCORE_EPOCH).total_seconds() / 86400
+    return 2.0 ** (days / half_life_days)
+
+
+def record_product_sales(items, order_date, sign=1):
+    """
+    Add (sign=1) or take back (sign=-1) the units in items, sold at order_date,
+    to each product's counters. Does not commit.
+    """
+    quantities = defaultdict(int)
+    for item in items:
+        if item.product_id is not None:
+            quantities[item.product_id] += item.quantity
+    weight = sale_weight(order_date)
+    # Same row order as reserve_stock, so concurrent checkouts can't deadlock
+    for product_id, quantity in sorted(quantities.items()):
+        db.session.execute(
+            db.update(Product)
+            .where(Product.id == product_id)
+            .values(units_sold=Product.units_sold + sign * quantity,
+                    sales_score=Product.sales_score + sign * quantity * weight)
+            .execution_options(synchronize_session=False)
+        )
+
+
+class BestsellerCache:
+    """
+    Top-seller id lists per scope (the whole store or one category).
+
+    Lists are recomputed after ttl seconds, so new sales show up within ttl,
+    and as soon as the catalog version changes, so deleted or edited products
+    never linger.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] == version and time.monotonic() < entry[1]:
+            return entry[2]
+        return None
+
+    def put(self, key, version, ids):
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, ids)
+
+
+def top_seller_ids(limit=6, category_id=None):
+    """Ids of the best-selling products, best first (ties in catalog order)"""
+    cache = get_bestseller_cache()
+    key = (category_id, limit)
+    version = catalog_version()
+    ids = cache.get(key, version)
+    if ids is None:
+        statement = db.select(Product.id).order_by(Product.sales_score.desc(), Product.id).limit(limit)
+        if category_id is not None:
+            statement = statement.where(Product.category_id == category_id)
+        ids = tuple(db.session.execute(statement).scalars())
+        cache.put(key, version, ids)
+    return ids
+
+
+def top_sellers(limit=6, category_id=None):
+    """The best-selling products (with their category), best first"""
+    return products_by_id(top_seller_ids(limit, category_id))
+
+
+def backfill_product_sales(batch_size=5000):
+    """
+    Recompute every product's counters from non-cancelled order history.
+
+    Items are summed per product and order in the database, and each order is
+    weighted as of its order_date, as record_product_sales does, so the
+    backfill reproduces the live scores exactly. Returns the number of
+    products updated.
+    """
+    totals = defaultdict(lambda: [0, 0.0])
+    rows = db.session.execute(
+        db.select(OrderItem.product_id, Order.order_date, db.func.sum(OrderItem.quantity))
+        .join(Order, OrderItem.order_id == Order.id)
+        .where(OrderItem.product_id.is_not(None), Order.status != 'Cancelled')
+        .group_by(OrderItem.product_id, Order.id, Order.order_date)
+        .execution_options(yield_per=batch_size)
+    )
+    for product_id, order_date, quantity in rows:
+        totals[product_id][0] += quantity
+        totals[product_id][1] += quantity * sale_weight(order_date)
+
+    db.session.execute(db.update(Product).values(units_sold=0, sales_score=0))
+    updates = [{'id': product_id, 'units_sold': units, 'sales_score': score}
+               for product_id, (units, score) in totals.items()]
+    for start in range(0, len(updates), batch_size):
+        db.session.execute(db.update(Product), updates[start:start + batch_size])
+    db.session.commit()
+    return len(updates)
+
+
+def init_bestsellers(app):
+    """Register best-seller settings and the per-worker list cache"""
+    app.config.setdefault('BESTSELLER_HALF_LIFE_DAYS', 14)  # A sale counts half as much after this many days
+    app.config.setdefault('BESTSELLER_CACHE_TTL', 60)  # Seconds before top-seller lists pick up new sales
+    cache = BestsellerCache(ttl=app.config['BESTSELLER_CACHE_TTL'])
+    app.extensions['bestseller_cache'] = cache
+    return cache
+
+
+def get_bestseller_cache(app=None):
+    """Return the best-seller cache for app (defaults to the current app)"""
+    return (app or current_app).extensions['bestseller_cache']
@@ -0,0 +1,92 @@
+"""
+Catalog Version
+Database counter bumped whenever products or categories change, so caches
+held by each worker can tell when they are out of date
+"""
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, CatalogVersion
+
+CATALOG_VERSION_ID = 1  # The counter's only row
+
+
+class CatalogClock:
+    """
+    Per-worker view of the catalog version.
+
+    The stored version is read at most once every ttl seconds, so a write
+    made by another worker is seen within ttl seconds while hot pages don't
+    pay for a query on every request.
+    """
+
+    def __init__(self, ttl=1.0):
+        self.ttl = ttl
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the catalog version, re-reading it from the database once ttl has passed"""
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < self.ttl:
+                return self._version
+        version = db.session.execute(
+            db.select(CatalogVersion.version).where(CatalogVersion.id == CATALOG_VERSION_ID)
+        ).scalar() or 0
+        with self._lock:
+            self._version = version
+            self._checked_at = time.monotonic()
+        return version
+
+    def expire(self):
+        """Force the next current() to read the database"""
+        with self._lock:
+            self._version = None
+
+
+def bump_catalog_version():
+    """
+    Increment the catalog version in the current transaction. Does not commit.
+
+    Call it alongside any product or category write so the bump commits (or
+    rolls back) together with the change it announces.
+    """
+    result = db.session.execute(
+        db.update(CatalogVersion)
+        .where(CatalogVersion.id == CATALOG_VERSION_ID)
+        .values(version=CatalogVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        # First write ever; another worker may be creating the row at the same moment
+        try:
+            with db.session.begin_nested():
+                db.session.add(CatalogVersion(id=CATALOG_VERSION_ID, version=1))
+        except IntegrityError:
+            db.session.execute(
+                db.update(CatalogVersion)
+                .where(CatalogVersion.id == CATALOG_VERSION_ID)
+                .values(version=CatalogVersion.version + 1)
+            )
+    get_catalog_clock().expire()
+
+
+def init_catalog(app):
+    """Create the app's catalog clock from config"""
+    app.config.setdefault('CATALOG_VERSION_TTL', 1.0)  # Seconds a worker trusts its last read of the version
+    clock = CatalogClock(ttl=app.config['CATALOG_VERSION_TTL'])
+    app.extensions['catalog_clock'] = clock
+    return clock
+
+
+def get_catalog_clock(app=None):
+    """Return the catalog clock for app (defaults to the current app)"""
+    return (app or current_app).extensions['catalog_clock']
+
+
+def catalog_version():
+    """The current catalog version as seen by this worker"""
+    return get_catalog_clock().current()
@@ -0,0 +1,145 @@
+"""
+Response Compression
+Opt-in gzip/brotli compression of dynamic responses, negotiated via Accept-Encoding
+"""
+import itertools
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MIMETYPES = [
+    'text/html',
+    'text/plain',
+    'text/csv',
+    'application/json',
+    'application/x-ndjson',
+]
+
+
+def _choose_encoding():
+    """Pick the best encoding both sides support, or None"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br'] > 0:
+        return 'br'
+    if accepted['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def _compressor(app, encoding):
+    """Return (compress(chunk) -> bytes, flush() -> bytes, finish() -> bytes) for the chosen encoding"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=app.config['COMPRESS_BR_QUALITY'])
+        return compressor.process, compressor.flush, compressor.finish
+
+    # wbits=31 produces a gzip container
+    compressor = zlib.compressobj(app.config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _encoded(chunks):
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if chunk:
+            yield chunk
+
+
+def _compress_stream(head, chunks, compressor, flush_size):
+    """
+    Compress a streamed body as it is produced: head (chunks already read),
+    then the rest of chunks.
+
+    Streamed templates yield many small pieces, and flushing the compressor
+    after each one would leave little to compress, so the output is flushed
+    once flush_size bytes have gone in since the last flush. The page still
+    renders progressively, a few KB at a time.
+    """
+    compress, flush, finish = compressor
+    unflushed = 0
+    try:
+        for chunk in itertools.chain(head, _encoded(chunks)):
+            data = compress(chunk)
+            unflushed += len(chunk)
+            if unflushed >= flush_size:
+                data += flush()
+                unflushed = 0
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _should_compress(app, response):
+    """Check if a response is eligible for compression"""
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if request.method == 'HEAD' or response.direct_passthrough:
+        return False  # send_file responses (static, uploads, assets) are handled separately
+    if 'Content-Encoding' in response.headers:
+        return False
+    if response.mimetype not in app.config['COMPRESS_MIMETYPES']:
+        return False
+    if 'no-transform' in response.headers.get('Cache-Control', ''):
+        return False
+    return True
+
+
+def init_compression(app):
+    """Register the compression hook (a no-op unless COMPRESS_RESPONSES is enabled)"""
+    app.config.setdefault('COMPRESS_RESPONSES', False)
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)  # Bytes; smaller bodies aren't worth the CPU
+    app.config.setdefault('COMPRESS_FLUSH_SIZE', 16 * 1024)  # Bytes of a streamed body between flushes
+    app.config.setdefault('COMPRESS_LEVEL', 6)  # gzip level 1-9
+    app.config.setdefault('COMPRESS_BR_QUALITY', 4)  # brotli quality 0-11; 4 compresses better than gzip -6 at similar cost
+    app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config['COMPRESS_RESPONSES'] or not _should_compress(app, response):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = _choose_encoding()
+        if encoding is None:
+            return response
+
+        compressor = _compressor(app, encoding)
+
+        if response.is_streamed:
+            # Size is unknown up front: read ahead far enough to tell if it is worth
+            # compressing, then compress the rest as it is produced
+            chunks = iter(response.response)
+            head, size = [], 0
+            for chunk in _encoded(chunks):
+                head.append(chunk)
+                size += len(chunk)
+                if size >= app.config['COMPRESS_MIN_SIZE']:
+                    break
+            else:
+                response.response = head
+                return response
+            response.response = _compress_stream(head, chunks, compressor, app.config['COMPRESS_FLUSH_SIZE'])
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < app.config['COMPRESS_MIN_SIZE']:
+                return response
+            compress, _, finish = compressor
+            response.set_data(compress(data) + finish())
+
+        response.content_encoding = encoding
+        etag, _ = response.get_etag()
+        if etag:
+            # The compressed body differs byte-for-byte from the identity one
+            response.set_etag(etag, weak=True)
+        return response
+
+    return compress_response
@@ -3,15 +3,32 @@ Email Service for Order Management
 Handles all email notifications for orders, cancellations, and status updates
 """
 from flask import current_app
-from flask_mail import Message
+import atexit
+import smtplib
+import threading
+import time
 import traceback
 import logging
 
 logger = logging.getLogger(__name__)
 
+_email_batches_lock = threading.Lock()
+
+
+def get_mail(app=None):
+    """Return the app's Flask-Mail instance, importing and initializing Flask-Mail on first use"""
+    app = app or current_app
+    mail = app.extensions.get('mail')
+    if mail is None:
+        from flask_mail import Mail
+        mail = Mail(app)  # Registers itself as app.extensions['mail']
+    return mail
+
 
 def send_order_confirmation(mail, order, user):
     """Send order confirmation email to customer and admin"""
+    from flask_mail import Message
+
     try:
         logger.info(f"📧 Preparing order confirmation email for {user.email}")
         
@@ -143,62 +160,69 @@ SecretsClan Order Management System
         return False
 
 
+def _status_update_message(order, user, old_status, sender):
+    """Build the status update email for one order"""
+    from flask_mail import Message
+
+    msg = Message(
+        subject=f'Order Status Update - #{order.id}',
+        recipients=[user.email],
+        sender=sender
+    )
+    
+    status_color = {
+        'Pending': '#FF9800',
+        'Processing': '#2196F3',
+        'Shipped': '#9C27B0',
+        'Delivered': '#4CAF50',
+        'Cancelled': '#F44336'
+    }.get(order.status, '#666')
+    
+    status_messages = {
+        'Processing': 'Your order is being processed and will be packed soon.',
+        'Packed': 'Your order has been packed and is ready for shipment.',
+        'Shipped': 'Great news! Your order is on its way to you.',
+        'Delivered': 'Your order has been delivered. Thank you for shopping with us!',
+        'Cancelled': 'Your order has been cancelled.'
+    }
+    
+    msg.html = f"""
+    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+        <h2 style="color: #2196F3;">Order Status Update</h2>
+        <p>Dear {user.name},</p>
+        <p>Your order <strong>#{order.id}</strong> status has been updated.</p>
+        
+        <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
+            {f'<p style="margin: 0 0 10px 0;"><strong>Previous Status:</strong> {old_status}</p>' if old_status else ''}
+            <p style="margin: 0;"><strong>Current Status:</strong> 
+            <span style="color: {status_color}; font-size: 18px; font-weight: bold;">{order.status}</span></p>
+        </div>
+        
+        <p style="background-color: #e3f2fd; padding: 10px; border-left: 4px solid #2196F3;">
+            {status_messages.get(order.status, 'Your order status has been updated.')}
+        </p>
+        
+        <p><strong>Order Total:</strong> ₹{order.total_price:.2f}</p>
+        <p><strong>Payment Method:</strong> {order.payment_method}</p>
+        <p><strong>Order Date:</strong> {order.order_date.strftime('%B %d, %Y at %I:%M %p')}</p>
+        
+        <hr style="margin: 20px 0;">
+        <p style="color: #666; font-size: 12px;">
+            Thank you for shopping with us!<br>
+            <strong>SecretsClan Team</strong>
+        </p>
+    </div>
+    """
+    return msg
+
+
 def send_order_status_update(mail, order, user, old_status=None):
     """Send order status update email to customer"""
     try:
         logger.info(f"📧 Preparing status update email for order #{order.id}")
         
         sender = current_app.config.get('MAIL_DEFAULT_SENDER') or current_app.config.get('MAIL_USERNAME')
-        
-        msg = Message(
-            subject=f'Order Status Update - #{order.id}',
-            recipients=[user.email],
-            sender=sender
-        )
-        
-        status_color = {
-            'Pending': '#FF9800',
-            'Processing': '#2196F3',
-            'Shipped': '#9C27B0',
-            'Delivered': '#4CAF50',
-            'Cancelled': '#F44336'
-        }.get(order.status, '#666')
-        
-        status_messages = {
-            'Processing': 'Your order is being processed and will be packed soon.',
-            'Packed': 'Your order has been packed and is ready for shipment.',
-            'Shipped': 'Great news! Your order is on its way to you.',
-            'Delivered': 'Your order has been delivered. Thank you for shopping with us!',
-            'Cancelled': 'Your order has been cancelled.'
-        }
-        
-        msg.html = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2 style="color: #2196F3;">Order Status Update</h2>
-            <p>Dear {user.name},</p>
-            <p>Your order <strong>#{order.id}</strong> status has been updated.</p>
-            
-            <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                {f'<p style="margin: 0 0 10px 0;"><strong>Previous Status:</strong> {old_status}</p>' if old_status else ''}
-                <p style="margin: 0;"><strong>Current Status:</strong> 
-                <span style="color: {status_color}; font-size: 18px; font-weight: bold;">{order.status}</span></p>
-            </div>
-            
-            <p style="background-color: #e3f2fd; padding: 10px; border-left: 4px solid #2196F3;">
-                {status_messages.get(order.status, 'Your order status has been updated.')}
-            </p>
-            
-            <p><strong>Order Total:</strong> ₹{order.total_price:.2f}</p>
-            <p><strong>Payment Method:</strong> {order.payment_method}</p>
-            <p><strong>Order Date:</strong> {order.order_date.strftime('%B %d, %Y at %I:%M %p')}</p>
-            
-            <hr style="margin: 20px 0;">
-            <p style="color: #666; font-size: 12px;">
-                Thank you for shopping with us!<br>
-                <strong>SecretsClan Team</strong>
-            </p>
-        </div>
-        """
+        msg = _status_update_message(order, user, old_status, sender)
         
         logger.info(f"📤 Sending status update to {user.email}...")
         mail.send(msg)
@@ -211,8 +235,92 @@ def send_order_status_update(mail, order, user, old_status=None):
         return False
 
 
+def build_order_status_updates(notifications):
+    """Status update emails for (order, user, old_status) tuples, built while the orders are still loaded"""
+    sender = current_app.config.get('MAIL_DEFAULT_SENDER') or current_app.config.get('MAIL_USERNAME')
+    return [_status_update_message(order, user, old_status, sender) for order, user, old_status in notifications]
+
+
+def send_messages(mail, messages):
+    """
+    Send messages over a single SMTP session (Flask-Mail reconnects every
+    MAIL_MAX_EMAILS messages if that is set). A refused message is logged
+    and skipped; a dropped connection ends the batch. Returns the number sent.
+    """
+    sent = 0
+    try:
+        with mail.connect() as connection:
+            for msg in messages:
+                try:
+                    connection.send(msg)
+                    sent += 1
+                except smtplib.SMTPServerDisconnected:
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ Failed to send '{msg.subject}' to {', '.join(msg.recipients)}: {e}")
+    except Exception as e:
+        logger.error(f"❌ Email batch interrupted: {str(e)}")
+        logger.error(traceback.format_exc())
+    logger.info(f"✅ Sent {sent} of {len(messages)} emails in one SMTP session")
+    return sent
+
+
+def _email_batches(app):
+    """{thread: messages} of the app's background batches still sending, created on first use"""
+    with _email_batches_lock:
+        batches = app.extensions.get('email_batches')
+        if batches is None:
+            batches = app.extensions['email_batches'] = {}
+            atexit.register(wait_for_email_batches, app)  # Also called from gunicorn's worker_exit hook
+        return batches
+
+
+def send_messages_in_background(app, messages):
+    """Send messages with send_messages from a background thread, so the request doesn't wait on SMTP"""
+    batches = _email_batches(app)
+
+    def send():
+        try:
+            with app.app_context():
+                send_messages(get_mail(app), messages)
+        finally:
+            batches.pop(thread, None)
+
+    thread = threading.Thread(target=send, name='email-batch', daemon=True)
+    batches[thread] = messages
+    thread.start()
+
+
+def wait_for_email_batches(app, timeout=None):
+    """
+    Wait for background email batches to finish before the process exits
+    (the threads are daemons and would be killed mid-batch). Messages of
+    batches still sending after timeout seconds (EMAIL_EXIT_TIMEOUT, default
+    20) are logged so they can be resent by hand. Returns the number of
+    batches left unfinished.
+    """
+    batches = app.extensions.get('email_batches')
+    if not batches:
+        return 0
+    if timeout is None:
+        timeout = app.config.get('EMAIL_EXIT_TIMEOUT', 20)
+
+    logger.info(f"📤 Waiting for {len(batches)} email batches to finish sending...")
+    deadline = time.monotonic() + timeout
+    for thread in list(batches):
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    unfinished = list(batches.values())
+    for messages in unfinished:
+        for msg in messages:
+            logger.error(f"❌ Email may not have been sent (process exiting): '{msg.subject}' to {', '.join(msg.recipients)}")
+    return len(unfinished)
+
+
 def send_order_cancellation(mail, order, user, cancelled_by='customer'):
     """Send order cancellation email to customer and admin"""
+    from flask_mail import Message
+
     try:
         logger.info(f"📧 Preparing cancellation email for order #{order.id}")
         
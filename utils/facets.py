@@ -0,0 +1,144 @@
+"""
+Faceted Search
+Filters, sorts and counts product listings; every facet comes from one
+grouped query over the matching set
+"""
+from flask import current_app
+from sqlalchemy.orm import contains_eager
+
+from models import db, Category, Product
+from utils.catalog import catalog_version
+from utils.search_cache import get_search_cache
+
+# Sort options offered on listing pages: key -> (label, ORDER BY)
+SORT_OPTIONS = {
+    '': ('Featured', Product.id.asc()),  # Catalog order, as listings were shown before sorting existed
+    'price_asc': ('Price: Low to High', Product.price.asc()),
+    'price_desc': ('Price: High to Low', Product.price.desc()),
+    'bestselling': ('Best Selling', Product.sales_score.desc()),
+    'most_viewed': ('Most Viewed', Product.view_count.desc()),
+}
+UNCACHED_SORTS = {'bestselling', 'most_viewed'}  # Order changes with every sale or view, not just with catalog edits
+
+
+def price_buckets(boundaries=None):
+    """
+    Turn ascending price boundaries into (key, label, low, high) buckets.
+
+    (1000, 2500) gives 'Under Rs. 1,000', 'Rs. 1,000 - 2,500' and
+    'Rs. 2,500+'; low is inclusive, high exclusive, None means unbounded.
+    """
+    if boundaries is None:
+        boundaries = current_app.config['PRICE_BUCKETS']
+    edges = [None, *boundaries, None]
+    buckets = []
+    for low, high in zip(edges, edges[1:]):
+        if low is None:
+            label = f'Under Rs. {high:,}'
+        elif high is None:
+            label = f'Rs. {low:,}+'
+        else:
+            label = f'Rs. {low:,} - {high:,}'
+        key = f"{low or 0}-{high or ''}"
+        buckets.append((key, label, low, high))
+    return buckets
+
+
+def _bucket_column(buckets):
+    """SQL expression giving the index of the bucket a product's price falls in"""
+    whens = [(Product.price < high, index) for index, (_, _, _, high) in enumerate(buckets) if high is not None]
+    return db.case(*whens, else_=len(buckets) - 1)
+
+
+def products_by_id(ids):
+    """Load products (with their category) in the order of ids"""
+    if not ids:
+        return []
+    products = (Product.query.join(Category).options(contains_eager(Product.category))
+                .filter(Product.id.in_(ids)).all())
+    position = {id: index for index, id in enumerate(ids)}
+    return sorted(products, key=lambda product: position[product.id])
+
+
+def search_products(match, category_id=None, price=None, sort='', cache_key=None):
+    """
+    Products satisfying match (a SQL condition) narrowed by the category and
+    price bucket filters, plus facet counts for the listing's sidebar.
+
+    Counts are taken from a single GROUP BY (category, price bucket) over the
+    whole matching set. Category counts respect the selected price bucket
+    and bucket counts respect the selected category, so each number is what
+    the shopper gets by clicking it. Unknown filter values are ignored.
+
+    Returns (products, facets) where facets is a dict with 'categories'
+    [(id, name, count)], 'prices' [(key, label, count)], 'total' and the
+    applied 'category_id', 'price' and 'sort'.
+
+    With a cache_key (which must identify match), the product ids and facets
+    are cached for the current catalog version, and a hit only loads the
+    listed products by primary key. Best-selling and most-viewed listings are
+    never cached.
+    """
+    cache = get_search_cache() if cache_key is not None and sort not in UNCACHED_SORTS else None
+    if cache is not None:
+        key = (catalog_version(), cache_key, category_id, price, sort)
+        cached = cache.get(key)
+        if cached is not None:
+            ids, facets = cached
+            return products_by_id(ids), facets
+
+    buckets = price_buckets()
+    bucket_index = {key: index for index, (key, _, _, _) in enumerate(buckets)}
+    selected_bucket = bucket_index.get(price)
+    if sort not in SORT_OPTIONS:
+        sort = ''
+
+    bucket = _bucket_column(buckets).label('bucket')
+    rows = db.session.execute(
+        db.select(Category.id, Category.name, bucket, db.func.count(Product.id))
+        .select_from(Product)
+        .join(Category)
+        .where(match)
+        .group_by(Category.id, Category.name, bucket)
+    ).all()
+
+    names = {cat_id: cat_name for cat_id, cat_name, _, _ in rows}
+    if category_id not in names:
+        category_id = None  # Not among the matches, so don't filter an empty page
+
+    category_counts, price_counts, total = {}, [0] * len(buckets), 0
+    for cat_id, _, index, count in rows:
+        in_price = selected_bucket is None or index == selected_bucket
+        in_category = category_id is None or cat_id == category_id
+        if in_price:
+            category_counts[cat_id] = category_counts.get(cat_id, 0) + count
+        if in_category:
+            price_counts[index] += count
+        if in_price and in_category:
+            total += count
+
+    products = []
+    if total:
+        query = Product.query.join(Category).options(contains_eager(Product.category)).filter(match)
+        if category_id is not None:
+            query = query.filter(Product.category_id == category_id)
+        if selected_bucket is not None:
+            _, _, low, high = buckets[selected_bucket]
+            if low is not None:
+                query = query.filter(Product.price >= low)
+            if high is not None:
+                query = query.filter(Product.price < high)
+        products = query.order_by(SORT_OPTIONS[sort][1], Product.id).all()
+
+    facets = {
+        'categories': sorted(((cat_id, names[cat_id], count) for cat_id, count in category_counts.items()),
+                             key=lambda facet: (-facet[2], facet[1])),
+        'prices': [(key, label, price_counts[index]) for index, (key, label, _, _) in enumerate(buckets)],
+        'total': total,
+        'category_id': category_id,
+        'price': buckets[selected_bucket][0] if selected_bucket is not None else None,
+        'sort': sort,
+    }
+    if cache is not None and len(products) <= current_app.config['SEARCH_CACHE_MAX_RESULTS']:
+        cache.put(key, ([product.id for product in products], facets))
+    return products, facets
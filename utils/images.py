@@ -0,0 +1,207 @@
+"""
+Image Service for Product Uploads
+Decodes each upload once and re-encodes it into resized WebP and JPEG variants
+in a background worker pool so admin requests return immediately
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> maximum width in pixels (card thumbnail, detail view, retina detail view)
+IMAGE_SIZES = {
+    'thumb': 400,
+    'detail': 800,
+    'retina': 1600,
+}
+
+# Output format -> (file extension, Pillow save options)
+IMAGE_FORMATS = {
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Uploads and their variants are named by the SHA-256 of the original's content
+CONTENT_ADDRESSED_RE = re.compile(r'^[0-9a-f]{64}(_[a-z]+)?\.[a-z]+$')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_content_addressed(filename):
+    """Check if a stored filename is derived from its content (and therefore never changes)"""
+    return bool(CONTENT_ADDRESSED_RE.match(filename))
+
+
+def store_upload(file, storage, chunk_size=64 * 1024):
+    """
+    Stream an uploaded file into storage under the hash of its content.
+
+    The upload is hashed while it is copied chunk by chunk to a staging file,
+    then saved as ``<sha256>.<ext>``. If a blob with that hash already exists
+    the copy is discarded, so identical images are stored once. The existing
+    blob and its variants are touched instead: they may be old orphans, and
+    the fresh timestamp keeps the upload GC off them until the product
+    referencing them is saved.
+    Returns the stored filename.
+    """
+    ext = os.path.splitext(file.filename)[1].lower()
+    digest = hashlib.sha256()
+
+    fd, tmp_path = tempfile.mkstemp(dir=storage.staging_dir, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in iter(lambda: file.stream.read(chunk_size), b''):
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        filename = f"{digest.hexdigest()}{ext}"
+        if storage.touch(filename):
+            for name in variant_filenames(filename):
+                storage.touch(name)
+        else:
+            storage.save(filename, tmp_path)
+        return filename
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def variant_filename(filename, size, fmt='jpeg'):
+    """Name of a resized variant stored alongside the original upload"""
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}_{size}.{IMAGE_FORMATS[fmt][0]}"
+
+
+def variant_filenames(filename):
+    """All variant names that may exist for an original upload"""
+    return [variant_filename(filename, size, fmt) for size in IMAGE_SIZES for fmt in IMAGE_FORMATS]
+
+
+def generate_variants(source_path, output_dir, filename=None):
+    """
+    Write every size/format variant of source_path into output_dir.
+
+    The original is decoded once (JPEGs are DCT-downscaled while decoding),
+    orientation from EXIF is applied, and each smaller size is resized from the
+    previous one. Variants are saved without EXIF or other metadata.
+    Variants are named after filename (defaults to the source's name).
+    Returns a dict of variant name -> path written.
+    """
+    from PIL import Image, ImageOps
+
+    filename = filename or os.path.basename(source_path)
+    largest = max(IMAGE_SIZES.values())
+
+    with Image.open(source_path) as original:
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    # JPEG has no alpha channel: flatten transparent PNGs onto white
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        image = Image.new('RGB', rgba.size, (255, 255, 255))
+        image.paste(rgba, mask=rgba.getchannel('A'))
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    written = {}
+    for size, width in sorted(IMAGE_SIZES.items(), key=lambda item: item[1], reverse=True):
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.LANCZOS)
+
+        for fmt, (ext, options) in IMAGE_FORMATS.items():
+            name = variant_filename(filename, size, fmt)
+            fd, path = tempfile.mkstemp(dir=output_dir, prefix=f".{name}-")
+            with os.fdopen(fd, 'wb') as tmp:
+                image.save(tmp, format=fmt.upper(), **options)
+            written[name] = path
+
+    return written
+
+
+def _get_executor(app):
+    """Lazily create the per-process worker pool"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('IMAGE_WORKERS', 2),
+                thread_name_prefix='image-variants'
+            )
+    return _executor
+
+
+def _process_product_image(app, product_id, filename):
+    """Generate variants and flag the product once they are ready"""
+    from models import db, Product
+    from utils.storage import get_storage
+
+    with app.app_context():
+        storage = get_storage(app)
+        written = {}
+        try:
+            # Deduplicated uploads already have their variants
+            if not all(storage.exists(name) for name in variant_filenames(filename)):
+                with storage.local_copy(filename) as source_path:
+                    written = generate_variants(source_path, storage.staging_dir, filename)
+                # Each save is atomic, so readers never see a partial image
+                for name, path in written.items():
+                    storage.save(name, path)
+        except Exception as e:
+            for path in written.values():
+                if os.path.exists(path):
+                    os.remove(path)
+            logger.error(f"❌ Failed to generate image variants for {filename}: {e}")
+            return False
+
+        # Only flag the product if it still uses this image (it may have been replaced meanwhile)
+        db.session.execute(
+            db.update(Product)
+            .where(Product.id == product_id, Product.image_filename == filename)
+            .values(image_variants_ready=True)
+        )
+        db.session.commit()
+        logger.info(f"✅ Image variants ready for product #{product_id}")
+        return True
+
+
+def process_product_image(app, product_id, filename):
+    """Queue variant generation for a product's newly uploaded image"""
+    return _get_executor(app).submit(_process_product_image, app, product_id, filename)
+
+
+def build_missing_variants(app, limit=None):
+    """
+    Generate variants, in this process, for every product with an image whose
+    image_variants_ready flag is still False.
+
+    Covers images uploaded before variants existed and jobs lost from the
+    background pool when a worker restarted. Products are visited in id
+    order; a failure is logged and the product stays flagged for the next
+    run. Returns a dict of counts.
+    """
+    from models import db, Product
+
+    with app.app_context():
+        pending = db.session.execute(
+            db.select(Product.id, Product.image_filename)
+            .where(Product.image_variants_ready.is_(False), Product.image_filename.is_not(None))
+            .order_by(Product.id)
+            .limit(limit)
+        ).all()
+
+    stats = {'products': len(pending), 'ready': 0, 'failed': 0}
+    for product_id, filename in pending:
+        if _process_product_image(app, product_id, filename):
+            stats['ready'] += 1
+        else:
+            stats['failed'] += 1
+    return stats
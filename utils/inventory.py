@@ -0,0 +1,155 @@
+"""
+Inventory Service
+Reserves and releases product stock with conditional updates so concurrent
+checkouts can never drive stock below zero
+"""
+from collections import defaultdict
+
+from models import db, Product, Order
+from utils.sales_rollup import record_status_change, record_status_changes
+from utils.bestsellers import record_product_sales
+
+# Status changes allowed in bulk: forward through fulfilment, or cancelling
+# an order that hasn't shipped. Anything else (reopening a cancelled order,
+# correcting a mistake) is done one order at a time.
+BULK_TRANSITIONS = {
+    'Pending': {'Processing', 'Packed', 'Shipped', 'Cancelled'},
+    'Processing': {'Packed', 'Shipped', 'Cancelled'},
+    'Packed': {'Shipped', 'Cancelled'},
+    'Shipped': {'Delivered'},
+    'Delivered': set(),
+    'Cancelled': set(),
+}
+
+
+def _quantities_by_product(items):
+    """Sum quantities per product id, skipping items without a product"""
+    quantities = defaultdict(int)
+    for item in items:
+        if item.product_id is not None:
+            quantities[item.product_id] += item.quantity
+    # Always touch rows in the same order so concurrent transactions can't deadlock
+    return sorted(quantities.items())
+
+
+def reserve_stock(items):
+    """
+    Decrement stock for every (product_id, quantity) in items.
+
+    Each row is updated with ``UPDATE ... SET stock = stock - n WHERE stock >= n``
+    so the check and the decrement happen atomically in the database.
+    Returns the list of product ids that did not have enough stock; when it is
+    non-empty the caller must roll back the session.
+    Does not commit.
+    """
+    unavailable = []
+    for product_id, quantity in _quantities_by_product(items):
+        result = db.session.execute(
+            db.update(Product)
+            .where(Product.id == product_id, Product.stock >= quantity)
+            .values(stock=Product.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            unavailable.append(product_id)
+    return unavailable
+
+
+def release_stock(items):
+    """Return stock for every (product_id, quantity) in items. Does not commit."""
+    for product_id, quantity in _quantities_by_product(items):
+        db.session.execute(
+            db.update(Product)
+            .where(Product.id == product_id)
+            .values(stock=Product.stock + quantity)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def set_stock(product_id, expected, new_stock):
+    """
+    Set a product's stock to new_stock if it is still expected (the value an
+    admin saw when they opened the edit form).
+
+    An unconditional write would undo any reservation made by a checkout in
+    the meantime. Returns False if the stock changed underneath us.
+    Does not commit.
+    """
+    result = db.session.execute(
+        db.update(Product)
+        .where(Product.id == product_id, Product.stock == expected)
+        .values(stock=new_stock)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def transition_order_status(order, new_status):
+    """
+    Move an order to new_status, adjusting stock when it enters or leaves 'Cancelled'.
+
+    The status change is itself a conditional update on the old status, so two
+    concurrent cancellations restock only once. The daily sales rollups and
+    product sales counters move with it.
+    Returns True on success, False if the order changed underneath us or stock
+    could not be re-reserved. Does not commit.
+    """
+    old_status = order.status
+    if new_status == old_status:
+        return True
+
+    result = db.session.execute(
+        db.update(Order)
+        .where(Order.id == order.id, Order.status == old_status)
+        .values(status=new_status)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+
+    if new_status == 'Cancelled':
+        release_stock(order.order_items)
+        record_product_sales(order.order_items, order.order_date, sign=-1)
+    elif old_status == 'Cancelled':
+        if reserve_stock(order.order_items):
+            return False
+        record_product_sales(order.order_items, order.order_date)
+
+    record_status_change(order, old_status, new_status)
+    order.status = new_status
+    return True
+
+
+def bulk_transition_order_status(orders, new_status):
+    """
+    Move every order in orders that BULK_TRANSITIONS allows to new_status,
+    with a single UPDATE ... WHERE (id, status) IN (...).
+
+    Matching on the status each order was read with makes the update
+    conditional, as in transition_order_status. Cancelling releases the
+    orders' stock in one pass, and the rollups are adjusted in one batch.
+    Returns the list of (order, old_status) moved, or None if any of them
+    changed underneath us (the caller must roll back). Does not commit.
+    """
+    changes = [(order, order.status) for order in orders if new_status in BULK_TRANSITIONS.get(order.status, ())]
+    if not changes:
+        return []
+
+    result = db.session.execute(
+        db.update(Order)
+        .where(db.tuple_(Order.id, Order.status).in_([(order.id, old_status) for order, old_status in changes]))
+        .values(status=new_status)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(changes):
+        return None
+
+    if new_status == 'Cancelled':
+        release_stock([item for order, _ in changes for item in order.order_items])
+        for order, _ in changes:
+            record_product_sales(order.order_items, order.order_date, sign=-1)
+
+    record_status_changes([(order, old_status, new_status) for order, old_status in changes])
+    for order, _ in changes:
+        order.status = new_status
+    return changes
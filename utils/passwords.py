@@ -0,0 +1,111 @@
+"""
+Password Hashing
+Runs password hashing and verification in a bounded process pool so bursts of
+logins and signups cannot tie up the request workers serving the catalog
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when too many hash operations are already queued"""
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords with the configured Werkzeug method.
+
+    With workers > 0 the work runs in a process pool of that size, started on
+    first use so each gunicorn worker gets its own pool after forking. Pool
+    processes come from a forkserver rather than being forked from the
+    (threaded) worker, which could copy a lock held by another thread. At most
+    max_pending operations may be running or queued at once; callers beyond
+    that wait up to queue_timeout seconds for a slot (0: not at all) and then
+    get PasswordHasherBusy. The limit is per gunicorn worker and only matters
+    with threaded workers: a thread waiting on a hash holds its request, so
+    max_pending must stay below the worker's thread count to leave threads
+    for everything else. With workers == 0 hashing runs inline.
+    """
+
+    def __init__(self, method, workers=1, max_pending=4, queue_timeout=0.0):
+        self.method = method
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        """Start the process pool on first use"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('forkserver'))
+            return self._executor
+
+    def _run(self, func, *args):
+        """Run func in the pool, holding a queue slot until it finishes"""
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            logger.warning("Password hashing queue is full; rejecting request")
+            raise PasswordHasherBusy('Too many password operations in progress')
+        try:
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, password_hash, password)
+
+    @cached_property
+    def method_prefix(self):
+        """Canonical parameter string Werkzeug stores for the method (e.g. 'scrypt' -> 'scrypt:32768:8:1')"""
+        # Computed on first use rather than at startup, where one hash would cost as much as a login
+        return generate_password_hash('', self.method).split('$', 1)[0]
+
+    def needs_rehash(self, password_hash):
+        """Check if a stored hash was made with different parameters than the configured ones"""
+        return password_hash.split('$', 1)[0] != self.method_prefix
+
+    def shutdown(self):
+        """Stop the process pool (it is restarted on next use)"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+def init_passwords(app):
+    """Create the password hasher from config and register it on the app"""
+    app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # Werkzeug's default cost
+    app.config.setdefault('PASSWORD_HASH_WORKERS', 1)  # Processes per app worker; 0 hashes inline
+    app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 4)  # Running + queued operations before rejecting; below gunicorn threads
+    app.config.setdefault('PASSWORD_HASH_QUEUE_TIMEOUT', 0.0)  # Seconds to wait for a free slot; waiting also holds a thread
+
+    hasher = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        queue_timeout=app.config['PASSWORD_HASH_QUEUE_TIMEOUT'],
+    )
+    app.extensions['password_hasher'] = hasher
+    return hasher
+
+
+def get_password_hasher(app=None):
+    """Return the password hasher for app (defaults to the current app)"""
+    return (app or current_app).extensions['password_hasher']
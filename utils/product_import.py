@@ -0,0 +1,175 @@
+"""
+Bulk Product Import
+Loads products from a CSV (optionally with a ZIP of images) in batched
+transactions, validating each row with the same rules as ProductForm
+"""
+import csv
+import io
+import logging
+import os
+import time
+import zipfile
+
+from flask import current_app
+from werkzeug.datastructures import FileStorage, MultiDict
+
+from models import db, Category, Product
+from forms import ProductForm
+from utils.images import store_upload, process_product_image
+from utils.storage import get_storage
+from utils.suggest import index_product
+from utils.catalog import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = ['name', 'description', 'price', 'stock', 'category', 'image']
+ALLOWED_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ImageArchive:
+    """Images from an uploaded ZIP, stored on first use and shared by rows naming the same file"""
+
+    def __init__(self, zip_file, storage):
+        self.zip = zipfile.ZipFile(zip_file)
+        self.storage = storage
+        # Match entries by base name so archives with a top-level folder work too
+        self.entries = {os.path.basename(info.filename): info for info in self.zip.infolist() if not info.is_dir()}
+        self.stored = {}
+
+    def store(self, name):
+        """Store an image from the archive and return its content-addressed filename"""
+        if name not in self.stored:
+            info = self.entries.get(name)
+            if info is None:
+                raise ValueError(f'Image "{name}" not found in ZIP')
+            if os.path.splitext(name)[1].lower() not in ALLOWED_IMAGE_EXTENSIONS:
+                raise ValueError('Only JPG, JPEG, and PNG images are allowed!')
+            with self.zip.open(info) as stream:
+                self.stored[name] = store_upload(FileStorage(stream=stream, filename=name), self.storage)
+        return self.stored[name]
+
+
+def _validate_row(row, category_ids, choices):
+    """Validate a CSV row with ProductForm; returns (values, errors)"""
+    category_name = (row.get('category') or '').strip()
+    category_id = category_ids.get(category_name.lower())
+    if category_id is None:
+        return None, [f'Unknown category "{category_name}"']
+
+    form = ProductForm(
+        formdata=MultiDict({
+            'name': (row.get('name') or '').strip(),
+            'description': (row.get('description') or '').strip(),
+            'price': (row.get('price') or '').strip(),
+            'stock': (row.get('stock') or '0').strip(),
+            'category_id': str(category_id),
+        }),
+        meta={'csrf': False}
+    )
+    form.category_id.choices = choices
+    if not form.validate():
+        errors = [f'{form[field].label.text}: {message}'
+                  for field, messages in form.errors.items() for message in messages]
+        return None, errors
+
+    return {
+        'name': form.name.data,
+        'description': form.description.data,
+        'price': form.price.data,
+        'stock': form.stock.data,
+        'category_id': form.category_id.data,
+    }, []
+
+
+def _insert_batch(batch):
+    """Insert one batch in its own transaction and return the new ids in row order"""
+    result = db.session.execute(
+        db.insert(Product).returning(Product.id, sort_by_parameter_order=True),
+        [values for _, values in batch]
+    )
+    ids = result.scalars().all()
+    bump_catalog_version()
+    db.session.commit()
+    return ids
+
+
+def import_products(csv_file, images_zip=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Import products from a CSV file object with the CSV_COLUMNS header.
+
+    Rows are read lazily, validated with ProductForm, and inserted with one
+    executemany INSERT per batch_size rows, each batch in its own transaction.
+    Category names are resolved to ids once up front. Images named in the
+    'image' column are taken from images_zip, stored content-addressed, and
+    resized in the image worker pool after their product is inserted.
+    Returns a dict with counts, per-row errors and throughput in rows/second.
+    """
+    started = time.perf_counter()
+    app = current_app._get_current_object()
+    storage = get_storage(app)
+
+    categories = db.session.execute(db.select(Category.id, Category.name)).all()
+    category_ids = {name.lower(): id for id, name in categories}
+    choices = [(id, name) for id, name in categories]
+
+    archive = ImageArchive(images_zip, storage) if images_zip else None
+    reader = csv.DictReader(io.TextIOWrapper(csv_file, encoding='utf-8-sig', newline=''))
+
+    result = {'rows': 0, 'imported': 0, 'errors': [], 'rows_per_second': 0.0}
+    missing = [column for column in ('name', 'description', 'price', 'category') if column not in (reader.fieldnames or [])]
+    if missing:
+        result['errors'].append((1, [f'Missing column(s): {", ".join(missing)}']))
+        return result
+
+    batch = []
+
+    def flush():
+        try:
+            ids = _insert_batch(batch)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Failed to insert import batch: {e}")
+            result['errors'].extend((line_number, [f'Database error: {e}']) for line_number, _ in batch)
+            batch.clear()
+            return
+        for product_id, (_, values) in zip(ids, batch):
+            index_product(product_id, values['name'])
+            if values['image_filename']:
+                process_product_image(app, product_id, values['image_filename'])
+        result['imported'] += len(ids)
+        batch.clear()
+
+    for row in reader:
+        line_number = reader.line_num
+        result['rows'] += 1
+        values, errors = _validate_row(row, category_ids, choices)
+
+        values = values or {}
+        values['image_filename'] = None
+        image_name = (row.get('image') or '').strip()
+        if not errors and image_name:
+            if archive is None:
+                errors = [f'Image "{image_name}" given but no ZIP was uploaded']
+            else:
+                try:
+                    values['image_filename'] = archive.store(image_name)
+                except (ValueError, zipfile.BadZipFile) as e:
+                    errors = [str(e)]
+
+        if errors:
+            result['errors'].append((line_number, errors))
+            continue
+
+        batch.append((line_number, values))
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    result['rows_per_second'] = result['rows'] / elapsed if elapsed else 0.0
+    logger.info(f"Imported {result['imported']}/{result['rows']} products in {elapsed:.2f}s "
+                f"({result['rows_per_second']:.0f} rows/s)")
+    return result
@@ -0,0 +1,212 @@
+"""
+Recommendations
+Frequently-bought-together products, computed offline from order history
+and served from a small precomputed table
+"""
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+
+from models import db, Order, OrderItem, Product, ProductPair, ProductRecommendation, RecommendationBuild
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS_PER_PRODUCT = 10
+MIN_CO_ORDERS = 2  # Pairs bought together only once are noise
+MAX_BASKET_ITEMS = 50  # Larger (wholesale) orders are skipped; their pairs grow quadratically
+BATCH_SIZE = 5000  # Rows per fetch, insert or IN (...) lookup
+
+
+def bought_together(product_id, limit=3):
+    """In-stock products most often bought with product_id, strongest first"""
+    return (Product.query
+            .join(ProductRecommendation, ProductRecommendation.related_id == Product.id)
+            .filter(ProductRecommendation.product_id == product_id, Product.stock > 0)
+            .order_by(ProductRecommendation.rank)
+            .limit(limit)
+            .all())
+
+
+def bought_together_with_cart(product_ids, limit=4):
+    """In-stock products most often bought with any of product_ids, excluding those products"""
+    if not product_ids:
+        return []
+    return (Product.query
+            .join(ProductRecommendation, ProductRecommendation.related_id == Product.id)
+            .filter(ProductRecommendation.product_id.in_(product_ids), Product.id.not_in(product_ids),
+                    Product.stock > 0)
+            .group_by(Product.id)
+            .order_by(db.func.sum(ProductRecommendation.score).desc(), Product.id)
+            .limit(limit)
+            .all())
+
+
+def _basket_rows(after_order_id, through_order_id):
+    """(order_id, product_id) of non-cancelled orders in (after_order_id, through_order_id], by order"""
+    order_item, order = OrderItem.__table__, Order.__table__  # Plain rows: no ORM overhead per order line
+    return db.session.execute(
+        db.select(order_item.c.order_id, order_item.c.product_id)
+        .join(order, order_item.c.order_id == order.c.id)
+        .where(order_item.c.order_id > after_order_id, order_item.c.order_id <= through_order_id,
+               order_item.c.product_id.is_not(None), order.c.status != 'Cancelled')
+        .order_by(order_item.c.order_id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+
+
+def count_pairs(rows):
+    """
+    Co-occurrence counts {(a, b): orders} for a <= b from (order_id, product_id)
+    rows sorted by order_id; (a, a) counts the orders containing a.
+
+    Only pairs that actually occur are stored, so this is the sparse
+    baskets-by-products matrix multiplied by its own transpose, built one
+    basket at a time.
+    """
+    pairs = Counter()
+    for _, basket_rows in itertools.groupby(rows, key=lambda row: row[0]):
+        basket = sorted({product_id for _, product_id in basket_rows})
+        if len(basket) <= MAX_BASKET_ITEMS:
+            pairs.update(itertools.combinations_with_replacement(basket, 2))
+    return pairs
+
+
+def _matrix_rows(pairs):
+    """ProductPair rows for both (a, b) and (b, a) of each counted pair"""
+    for (a, b), orders in pairs.items():
+        yield {'product_id': a, 'related_id': b, 'orders': orders}
+        if a != b:
+            yield {'product_id': b, 'related_id': a, 'orders': orders}
+
+
+def _batches(items, size=BATCH_SIZE):
+    items = iter(items)
+    while batch := list(itertools.islice(items, size)):
+        yield batch
+
+
+def top_neighbours(row_counts, order_counts, top_n=RECOMMENDATIONS_PER_PRODUCT):
+    """
+    The top_n neighbours of each product in row_counts ({product_id: {related_id: orders}})
+    as [(score, orders, related_id)], best first.
+
+    Pairs are scored by cosine similarity, orders together divided by the
+    geometric mean of each product's orders, so best sellers don't top
+    every list just by being in many baskets. Ties go to the lower id.
+    """
+    neighbours = {}
+    for product_id, row in row_counts.items():
+        candidates = (
+            (orders / math.sqrt(order_counts[product_id] * order_counts[related_id]), orders, -related_id)
+            for related_id, orders in row.items()
+            if related_id != product_id and orders >= MIN_CO_ORDERS
+        )
+        neighbours[product_id] = [(score, orders, -negated_id)
+                                  for score, orders, negated_id in heapq.nlargest(top_n, candidates)]
+    return neighbours
+
+
+def _replace_recommendations(product_ids, neighbours):
+    """Swap the stored recommendations of product_ids (all products if None) for neighbours. Does not commit."""
+    if product_ids is None:
+        db.session.execute(db.delete(ProductRecommendation))
+    else:
+        for batch in _batches(product_ids):
+            db.session.execute(db.delete(ProductRecommendation).where(ProductRecommendation.product_id.in_(batch)))
+    rows = ({'product_id': product_id, 'rank': rank, 'related_id': related_id, 'orders': orders, 'score': score}
+            for product_id, ranked in neighbours.items()
+            for rank, (score, orders, related_id) in enumerate(ranked))
+    written = 0
+    for batch in _batches(rows):
+        db.session.execute(db.insert(ProductRecommendation), batch)
+        written += len(batch)
+    return written
+
+
+def _full_build(through_order_id):
+    """Count every order up to through_order_id into a fresh matrix. Returns (pairs, row_counts, order_counts)."""
+    pairs = count_pairs(_basket_rows(0, through_order_id))
+    db.session.execute(db.delete(ProductPair))
+    for batch in _batches(_matrix_rows(pairs)):
+        db.session.execute(db.insert(ProductPair), batch)
+
+    row_counts = defaultdict(dict)
+    for (a, b), orders in pairs.items():
+        if orders >= MIN_CO_ORDERS or a == b:  # Most pairs are one-offs; don't hold them twice
+            row_counts[a][b] = orders
+            row_counts[b][a] = orders
+    order_counts = {product_id: row[product_id] for product_id, row in row_counts.items()}
+    return len(pairs), row_counts, order_counts
+
+
+def _incremental_build(after_order_id, through_order_id):
+    """Add orders in (after_order_id, through_order_id] to the matrix. Returns (pairs, row_counts, order_counts)."""
+    delta = count_pairs(_basket_rows(after_order_id, through_order_id))
+    touched = sorted({product_id for pair in delta for product_id in pair})
+
+    # Every changed cell is in a touched product's row: both products of a new pair were just ordered
+    row_counts = defaultdict(dict)
+    for batch in _batches(touched):
+        for product_id, related_id, orders in db.session.execute(
+            db.select(ProductPair.product_id, ProductPair.related_id, ProductPair.orders)
+            .where(ProductPair.product_id.in_(batch))
+        ):
+            row_counts[product_id][related_id] = orders
+
+    updates, inserts = [], []
+    for row in _matrix_rows(delta):
+        old = row_counts[row['product_id']].get(row['related_id'])
+        row_counts[row['product_id']][row['related_id']] = (old or 0) + row['orders']
+        (updates if old is not None else inserts).append(
+            {**row, 'orders': row_counts[row['product_id']][row['related_id']]}
+        )
+    for batch in _batches(updates):
+        db.session.execute(db.update(ProductPair), batch)
+    for batch in _batches(inserts):
+        db.session.execute(db.insert(ProductPair), batch)
+
+    neighbour_ids = sorted({related_id for row in row_counts.values() for related_id in row})
+    order_counts = {}
+    for batch in _batches(neighbour_ids):
+        order_counts.update(db.session.execute(
+            db.select(ProductPair.product_id, ProductPair.orders)
+            .where(ProductPair.product_id.in_(batch), ProductPair.related_id == ProductPair.product_id)
+        ).all())
+    return len(delta), row_counts, order_counts
+
+
+def build_recommendations(full=False, top_n=RECOMMENDATIONS_PER_PRODUCT):
+    """
+    Bring the co-occurrence matrix and the recommendations up to date with
+    non-cancelled orders.
+
+    A full build (the default until one has run) counts every order line in
+    one pass and rewrites both tables. Otherwise only orders placed since
+    the last build are counted: their pairs are added to the matrix and just
+    the products in them get new recommendations. Run a full build now and
+    then to pick up cancellations of counted orders, deleted products and
+    the changed popularity of products that did not sell.
+    Everything happens in one transaction. Returns a dict of counts and
+    elapsed seconds.
+    """
+    started = time.perf_counter()
+    through_order_id = db.session.execute(db.select(db.func.max(Order.id))).scalar() or 0
+    after_order_id = db.session.execute(db.select(db.func.max(RecommendationBuild.last_order_id))).scalar()
+    full = full or after_order_id is None
+
+    if full:
+        pairs, row_counts, order_counts = _full_build(through_order_id)
+    else:
+        pairs, row_counts, order_counts = _incremental_build(after_order_id, through_order_id)
+    neighbours = top_neighbours(row_counts, order_counts, top_n)
+    rows = _replace_recommendations(None if full else list(row_counts), neighbours)
+    db.session.add(RecommendationBuild(last_order_id=through_order_id, full=full))
+    db.session.commit()
+
+    stats = {'full': full, 'last_order_id': through_order_id, 'pairs': pairs,
+             'products': len(row_counts), 'rows': rows, 'seconds': time.perf_counter() - started}
+    logger.info(f"Built recommendations for {stats['products']} products in {stats['seconds']:.1f}s")
+    return stats
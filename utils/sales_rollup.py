@@ -0,0 +1,243 @@
+"""
+Sales Rollups
+Daily order, unit and revenue totals by status and by category, kept current
+as orders are placed, change status or are deleted, so sales reports never
+scan order history
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Order, OrderItem, Category, DailySales, DailyCategorySales
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_CATEGORY = 0  # Rollup bucket for items with no recorded category (product deleted before categories were recorded)
+BACKFILL_CHUNK_DAYS = 31
+EXCLUDED_FROM_REVENUE = ('Cancelled',)
+
+
+def order_day(order_date):
+    """The UTC calendar day an order counts towards"""
+    if order_date.tzinfo is not None:
+        order_date = order_date.astimezone(timezone.utc)
+    return order_date.date()
+
+
+def _as_date(value):
+    """date() from a DATE value, which SQLite returns as an ISO string"""
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _add_to_row(model, key, deltas):
+    """Add deltas to the rollup row identified by key, creating it if needed. Does not commit."""
+    conditions = [getattr(model, column) == value for column, value in key.items()]
+    increments = {column: getattr(model, column) + delta for column, delta in deltas.items()}
+    update = db.update(model).where(*conditions).values(**increments).execution_options(synchronize_session=False)
+    if db.session.execute(update).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(db.insert(model).values(**key, **deltas))
+    except IntegrityError:
+        # A concurrent transaction created the row after our update found nothing
+        db.session.execute(update)
+
+
+def _category_totals(items):
+    """
+    {category_id: [units, revenue]} for order items, by the category each was
+    sold in, so later moves or deletions of the product don't shift past sales
+    """
+    totals = defaultdict(lambda: [0, 0.0])
+    for item in items:
+        category_totals = totals[item.category_id if item.category_id is not None else UNKNOWN_CATEGORY]
+        category_totals[0] += item.quantity
+        category_totals[1] += item.price * item.quantity
+    return totals
+
+
+def _apply(order, status, category_totals, sign):
+    """Add (sign=1) or remove (sign=-1) one order's contribution under status"""
+    day = order_day(order.order_date)
+    units = sum(category_units for category_units, _ in category_totals.values())
+    _add_to_row(DailySales, {'day': day, 'status': status},
+                {'orders': sign, 'units': sign * units, 'revenue': sign * order.total_price})
+    # Rows are always touched in the same order so concurrent orders can't deadlock
+    for category_id, (category_units, revenue) in sorted(category_totals.items()):
+        _add_to_row(DailyCategorySales, {'day': day, 'status': status, 'category_id': category_id},
+                    {'units': sign * category_units, 'revenue': sign * revenue})
+
+
+def record_order(order, items):
+    """Count a newly placed (flushed) order and its items. Does not commit."""
+    _apply(order, order.status, _category_totals(items), 1)
+
+
+def record_status_change(order, old_status, new_status):
+    """Move an order's totals from old_status to new_status. Does not commit."""
+    record_status_changes([(order, old_status, new_status)])
+
+
+def record_status_changes(changes):
+    """
+    Move the totals of many orders, given as (order, old_status, new_status).
+
+    Deltas for the same day, status and category are added up first, so a
+    batch of orders from one day touches each rollup row once. Does not commit.
+    """
+    changes = [change for change in changes if change[1] != change[2]]
+    if not changes:
+        return
+
+    daily = defaultdict(lambda: [0, 0, 0.0])
+    by_category = defaultdict(lambda: [0, 0.0])
+    for order, old_status, new_status in changes:
+        day = order_day(order.order_date)
+        category_totals = _category_totals(order.order_items)
+        units = sum(category_units for category_units, _ in category_totals.values())
+        for status, sign in ((old_status, -1), (new_status, 1)):
+            totals = daily[day, status]
+            totals[0] += sign
+            totals[1] += sign * units
+            totals[2] += sign * order.total_price
+            for category_id, (category_units, revenue) in category_totals.items():
+                totals = by_category[day, status, category_id]
+                totals[0] += sign * category_units
+                totals[1] += sign * revenue
+
+    # Rows are always touched in the same order so concurrent updates can't deadlock
+    for (day, status), (orders, units, revenue) in sorted(daily.items()):
+        _add_to_row(DailySales, {'day': day, 'status': status},
+                    {'orders': orders, 'units': units, 'revenue': revenue})
+    for (day, status, category_id), (units, revenue) in sorted(by_category.items()):
+        _add_to_row(DailyCategorySales, {'day': day, 'status': status, 'category_id': category_id},
+                    {'units': units, 'revenue': revenue})
+
+
+def record_order_deleted(order):
+    """Remove a deleted order's totals. Does not commit."""
+    _apply(order, order.status, _category_totals(order.order_items), -1)
+
+
+def backfill_sales_rollups(start=None, end=None, chunk_days=BACKFILL_CHUNK_DAYS):
+    """
+    Rebuild the rollups from order history for days start..end (inclusive;
+    defaults to the first and last order).
+
+    Each chunk of chunk_days is aggregated in the database with two GROUP BY
+    queries (orders by day and status; items by day, status and category),
+    and its rollup rows are replaced in one transaction. Orders placed while
+    a chunk is being rebuilt may be missed, so backfill past days, or run it
+    while the store is quiet. Returns a dict of counts and elapsed seconds.
+    """
+    started = time.perf_counter()
+    stats = {'days': 0, 'orders': 0, 'rows': 0, 'seconds': 0.0}
+
+    if start is None or end is None:
+        first, last = db.session.execute(db.select(db.func.min(Order.order_date), db.func.max(Order.order_date))).one()
+        if first is None:
+            return stats
+        start = start or order_day(first)
+        end = end or order_day(last)
+
+    day_column = db.func.date(Order.order_date)
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        # Stored order dates are naive UTC
+        window = (Order.order_date >= datetime.combine(chunk_start, datetime.min.time()),
+                  Order.order_date < datetime.combine(chunk_end + timedelta(days=1), datetime.min.time()))
+
+        order_rows = db.session.execute(
+            db.select(day_column, Order.status, db.func.count(Order.id), db.func.sum(Order.total_price))
+            .where(*window)
+            .group_by(day_column, Order.status)
+        ).all()
+        category_id = db.func.coalesce(OrderItem.category_id, UNKNOWN_CATEGORY)
+        item_rows = db.session.execute(
+            db.select(day_column, Order.status, category_id,
+                      db.func.sum(OrderItem.quantity), db.func.sum(OrderItem.quantity * OrderItem.price))
+            .select_from(OrderItem)
+            .join(Order, OrderItem.order_id == Order.id)
+            .where(*window)
+            .group_by(day_column, Order.status, category_id)
+        ).all()
+
+        units = defaultdict(int)
+        category_sales = []
+        for day, status, category, category_units, revenue in item_rows:
+            day = _as_date(day)
+            units[day, status] += category_units
+            category_sales.append({'day': day, 'status': status, 'category_id': category,
+                                   'units': category_units, 'revenue': revenue})
+        daily_sales = [{'day': _as_date(day), 'status': status, 'orders': orders,
+                        'units': units[_as_date(day), status], 'revenue': revenue}
+                       for day, status, orders, revenue in order_rows]
+
+        for model in (DailySales, DailyCategorySales):
+            db.session.execute(db.delete(model).where(model.day >= chunk_start, model.day <= chunk_end))
+        if daily_sales:
+            db.session.execute(db.insert(DailySales), daily_sales)
+        if category_sales:
+            db.session.execute(db.insert(DailyCategorySales), category_sales)
+        db.session.commit()
+
+        stats['days'] += (chunk_end - chunk_start).days + 1
+        stats['orders'] += sum(row['orders'] for row in daily_sales)
+        stats['rows'] += len(daily_sales) + len(category_sales)
+        logger.info(f"Rolled up sales for {chunk_start} to {chunk_end}: {len(daily_sales)} day/status rows")
+        chunk_start = chunk_end + timedelta(days=1)
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def sales_report(days=30, today=None):
+    """
+    Sales for the last days days (including today, UTC), read from the rollups only.
+
+    Returns a dict with 'by_status' {status: {orders, units, revenue}},
+    'daily' [(day, orders, revenue)] for every day in the range,
+    'categories' [(name, units, revenue)] best first, and the 'since' date.
+    Cancelled orders are left out of daily and category revenue.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    since = today - timedelta(days=days - 1)
+
+    by_status = {}
+    for status, orders, units, revenue in db.session.execute(
+        db.select(DailySales.status, db.func.sum(DailySales.orders), db.func.sum(DailySales.units),
+                  db.func.sum(DailySales.revenue))
+        .where(DailySales.day >= since)
+        .group_by(DailySales.status)
+    ):
+        by_status[status] = {'orders': orders, 'units': units, 'revenue': revenue}
+
+    daily_totals = {
+        _as_date(day): (orders, revenue)
+        for day, orders, revenue in db.session.execute(
+            db.select(DailySales.day, db.func.sum(DailySales.orders), db.func.sum(DailySales.revenue))
+            .where(DailySales.day >= since, DailySales.status.not_in(EXCLUDED_FROM_REVENUE))
+            .group_by(DailySales.day)
+        )
+    }
+    daily = [(day, *daily_totals.get(day, (0, 0.0)))
+             for day in (since + timedelta(days=offset) for offset in range(days))]
+
+    names = dict(db.session.execute(db.select(Category.id, Category.name)).all())
+    categories = [
+        (names.get(category_id, 'Deleted products' if category_id == UNKNOWN_CATEGORY else 'Deleted category'),
+         units, revenue)
+        for category_id, units, revenue in db.session.execute(
+            db.select(DailyCategorySales.category_id, db.func.sum(DailyCategorySales.units),
+                      db.func.sum(DailyCategorySales.revenue))
+            .where(DailyCategorySales.day >= since, DailyCategorySales.status.not_in(EXCLUDED_FROM_REVENUE))
+            .group_by(DailyCategorySales.category_id)
+            .order_by(db.func.sum(DailyCategorySales.revenue).desc())
+        )
+    ]
+    return {'by_status': by_status, 'daily': daily, 'categories': categories, 'since': since}
@@ -0,0 +1,106 @@
+"""
+Search Cache
+Per-worker LRU of search results keyed by normalized query, invalidated by
+the catalog version
+"""
+from collections import OrderedDict
+import re
+import threading
+
+from flask import current_app
+
+SIBILANT_PLURAL_RE = re.compile(r'(ch|sh|ss|x|z)es$')  # watches, boxes, glasses
+
+
+def stem(word):
+    """Strip a plural ending so 'Watches' and 'watch' search alike (the stem is a prefix of both)"""
+    lowered = word.lower()
+    if not lowered[-2:-1].isalpha():
+        return word  # "men's", "4s": not a plural
+    if len(word) > 4 and SIBILANT_PLURAL_RE.search(lowered):
+        return word[:-2]
+    if len(word) > 3 and lowered.endswith('s') and not lowered.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def normalize_query(query):
+    """
+    The text a search matches as a substring: whitespace collapsed and the
+    last word's plural ending stripped.
+
+    Punctuation is kept ("T-Shirt", "men's polo" must match as typed), and
+    only the last word is stemmed, because a stem is a prefix of the word
+    and so still matches wherever the full word would; in mid-phrase it
+    would not.
+    """
+    words = query.split()
+    if words:
+        words[-1] = stem(words[-1])
+    return ' '.join(words)
+
+
+def query_cache_key(terms):
+    """
+    Cache key for a normalized query. ILIKE folds ASCII case on every
+    database, so queries differing only in ASCII case return the same
+    results and share an entry; other text is keyed exactly.
+    """
+    return terms.lower() if terms.isascii() else terms
+
+
+class SearchCache:
+    """
+    Bounded LRU of search results.
+
+    Keys start with the catalog version they were computed at, so a version
+    bump makes every older entry unreachable; those entries age out of the
+    LRU instead of being purged. Hit and miss counts are kept for the admin
+    dashboard.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries beyond max_entries"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def init_search_cache(app):
+    """Create the search result cache from config and register it on the app"""
+    app.config.setdefault('SEARCH_CACHE_SIZE', 1024)  # Entries per worker; 0 disables caching
+    app.config.setdefault('SEARCH_CACHE_MAX_RESULTS', 1000)  # Larger result lists aren't cached
+    cache = SearchCache(max_entries=app.config['SEARCH_CACHE_SIZE']) if app.config['SEARCH_CACHE_SIZE'] else None
+    app.extensions['search_cache'] = cache
+    return cache
+
+
+def get_search_cache(app=None):
+    """Return the search cache for app (defaults to the current app), or None when disabled"""
+    return (app or current_app).extensions['search_cache']
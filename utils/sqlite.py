@@ -0,0 +1,34 @@
+"""
+SQLite Settings
+Puts SQLite databases in write-ahead-log mode so long reads, like a streamed
+admin table or order export, don't lock out checkouts
+"""
+from sqlalchemy import event
+
+from models import db
+
+
+def _enable_wal(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.close()
+
+
+def init_sqlite(app):
+    """
+    Enable WAL mode on every new connection when the database is SQLite.
+
+    In the default rollback-journal mode an open read transaction blocks every
+    commit, and a streamed response keeps its read open until the client has
+    downloaded the whole body. With WAL, readers see a snapshot and writers
+    append to the log, so neither waits for the other. The mode is stored in
+    the database file; setting it per connection also covers databases
+    created later by init_db.py. In-memory databases stay as they are.
+    """
+    app.config.setdefault('SQLITE_WAL', True)
+    if not app.config['SQLITE_WAL']:
+        return
+    with app.app_context():
+        engine = db.engine  # Created by db.init_app(); no connection is opened here
+    if engine.dialect.name == 'sqlite' and not event.contains(engine, 'connect', _enable_wal):
+        event.listen(engine, 'connect', _enable_wal)
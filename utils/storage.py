@@ -0,0 +1,262 @@
+"""
+Image Storage Backends
+Keeps uploaded product images on the local filesystem or in an S3-compatible
+bucket so every node in a multi-node deployment sees the same files
+"""
+from contextlib import contextmanager
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed objects never change, so clients and CDNs may cache them forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class ImageStorage:
+    """Interface shared by all storage backends"""
+
+    # Directory where temporary files should be staged before save();
+    # None means the system temp directory
+    staging_dir = None
+
+    def save(self, name, path):
+        """Store the local file at path under name. The backend may consume (move) the file."""
+        raise NotImplementedError
+
+    def exists(self, name):
+        """Check if an object is stored under name"""
+        raise NotImplementedError
+
+    def delete(self, name):
+        """Delete name if present. Returns True if something was removed."""
+        raise NotImplementedError
+
+    def touch(self, name):
+        """Set name's modified time to now. Returns False if nothing is stored under name."""
+        raise NotImplementedError
+
+    def modified(self, name):
+        """Modified timestamp of name, or None if nothing is stored under name"""
+        raise NotImplementedError
+
+    def url(self, name):
+        """Public URL for name"""
+        raise NotImplementedError
+
+    @contextmanager
+    def local_copy(self, name):
+        """Yield a local filesystem path holding the contents of name"""
+        raise NotImplementedError
+
+    def iter_objects(self):
+        """Lazily yield (name, size in bytes, modified timestamp) for every stored object"""
+        raise NotImplementedError
+
+    def quarantine(self, name):
+        """Move name out of the served namespace instead of deleting it"""
+        raise NotImplementedError
+
+
+class LocalStorage(ImageStorage):
+    """Stores images in a directory served by the app's /uploads route"""
+
+    def __init__(self, folder, quarantine_folder, url_prefix='/uploads'):
+        self.folder = folder
+        self.url_prefix = url_prefix
+        self.quarantine_folder = quarantine_folder  # Must not be served (i.e. not under static/ or folder)
+        self.staging_dir = folder  # Same filesystem, so save() is an atomic rename
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.folder, name)
+
+    def save(self, name, path):
+        os.replace(path, self._path(name))
+
+    def exists(self, name):
+        return os.path.exists(self._path(name))
+
+    def delete(self, name):
+        try:
+            os.remove(self._path(name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def touch(self, name):
+        try:
+            os.utime(self._path(name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def modified(self, name):
+        try:
+            return os.stat(self._path(name)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def url(self, name):
+        return f'{self.url_prefix}/{name}'
+
+    @contextmanager
+    def local_copy(self, name):
+        yield self._path(name)
+
+    def iter_objects(self):
+        # scandir streams directory entries and caches stat results on most platforms
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    yield entry.name, stat.st_size, stat.st_mtime
+
+    def quarantine(self, name):
+        os.makedirs(self.quarantine_folder, exist_ok=True)
+        # May be on another filesystem than the uploads (e.g. a separate instance volume)
+        shutil.move(self._path(name), os.path.join(self.quarantine_folder, name))
+
+
+class S3Storage(ImageStorage):
+    """
+    Stores images in an S3-compatible bucket (AWS S3, MinIO, Cloudflare R2, ...).
+
+    Uploads and downloads are streamed in parts by boto3's transfer manager, so
+    memory use stays bounded regardless of image size. Point endpoint_url at a
+    local stand-in such as MinIO or moto's server for development.
+    """
+
+    def __init__(self, bucket, endpoint_url=None, region=None, public_url=None, prefix='',
+                 quarantine_prefix='quarantine/'):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError:
+            raise RuntimeError("IMAGE_STORAGE=s3 requires boto3: pip install boto3")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.quarantine_prefix = quarantine_prefix
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        self.transfer_config = TransferConfig(multipart_chunksize=8 * 1024 * 1024, max_concurrency=4)
+        if public_url:
+            self.public_url = public_url.rstrip('/')
+        elif endpoint_url:
+            self.public_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_url = f"https://{bucket}.s3.amazonaws.com"
+
+    def _key(self, name):
+        return f'{self.prefix}{name}'
+
+    def save(self, name, path):
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.client.upload_file(
+            path, self.bucket, self._key(name),
+            ExtraArgs={'ContentType': content_type, 'CacheControl': IMMUTABLE_CACHE_CONTROL},
+            Config=self.transfer_config
+        )
+        os.remove(path)
+
+    def _head(self, name):
+        """The object's metadata, or None if it doesn't exist"""
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def delete(self, name):
+        if not self.exists(name):
+            return False
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+        return True
+
+    def touch(self, name):
+        # S3 has no utime: copying an object onto itself with new metadata resets LastModified
+        from botocore.exceptions import ClientError
+        key = self._key(name)
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket, Key=key, CopySource={'Bucket': self.bucket, 'Key': key},
+                MetadataDirective='REPLACE', ContentType=content_type, CacheControl=IMMUTABLE_CACHE_CONTROL
+            )
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def modified(self, name):
+        head = self._head(name)
+        return head['LastModified'].timestamp() if head else None
+
+    def url(self, name):
+        return f'{self.public_url}/{self._key(name)}'
+
+    @contextmanager
+    def local_copy(self, name):
+        fd, path = tempfile.mkstemp(suffix=os.path.splitext(name)[1])
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self.client.download_fileobj(self.bucket, self._key(name), f, Config=self.transfer_config)
+            yield path
+        finally:
+            os.remove(path)
+
+    def iter_objects(self):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get('Contents', []):
+                name = obj['Key'][len(self.prefix):]
+                if '/' in name:
+                    continue  # Quarantined or unrelated nested keys
+                yield name, obj['Size'], obj['LastModified'].timestamp()
+
+    def quarantine(self, name):
+        key = self._key(name)
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=f'{self.prefix}{self.quarantine_prefix}{name}',
+            CopySource={'Bucket': self.bucket, 'Key': key}
+        )
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+def init_storage(app):
+    """Create the storage backend selected by IMAGE_STORAGE and register it on the app"""
+    backend = app.config.get('IMAGE_STORAGE', 'local')
+    if backend == 's3':
+        storage = S3Storage(
+            bucket=app.config['S3_BUCKET'],
+            endpoint_url=app.config.get('S3_ENDPOINT_URL'),
+            region=app.config.get('S3_REGION'),
+            public_url=app.config.get('S3_PUBLIC_URL'),
+            prefix=app.config.get('S3_PREFIX', ''),
+        )
+    elif backend == 'local':
+        # Quarantined uploads are kept out of static/, which Flask serves in full
+        app.config.setdefault('UPLOAD_QUARANTINE_FOLDER', os.path.join(app.instance_path, 'uploads_quarantine'))
+        storage = LocalStorage(app.config['UPLOAD_FOLDER'], app.config['UPLOAD_QUARANTINE_FOLDER'])
+    else:
+        raise ValueError(f"Unknown IMAGE_STORAGE backend: {backend}")
+
+    app.extensions['image_storage'] = storage
+    return storage
+
+
+def get_storage(app=None):
+    """Return the storage backend for app (defaults to the current app)"""
+    return (app or current_app).extensions['image_storage']
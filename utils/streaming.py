@@ -0,0 +1,45 @@
+"""
+Streaming Query Helpers
+Iterate large result sets with a server-side cursor so memory stays constant
+"""
+from flask import get_flashed_messages, stream_template
+
+from models import db
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def stream_scalars(statement, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Execute a select() and lazily yield ORM objects batch by batch.
+
+    yield_per makes the driver use a server-side cursor where supported
+    (PostgreSQL, MySQL) and fetches rows in batches on SQLite; objects are only
+    weakly referenced by the session, so already-rendered rows can be freed.
+    The query only runs on first iteration, i.e. inside the context that
+    stream_template/stream_with_context re-pushes while the body is sent.
+    """
+    yield from db.session.execute(statement.execution_options(yield_per=batch_size)).scalars()
+
+
+def stream_rows(statement, batch_size=DEFAULT_BATCH_SIZE):
+    """Like stream_scalars, but yields plain result rows (for column selects)"""
+    yield from db.session.execute(statement.execution_options(yield_per=batch_size))
+
+
+def stream_page(template_name, **context):
+    """
+    stream_template() for pages extending base.html.
+
+    The session cookie goes out with the headers, before the body renders, so
+    flashed messages are popped here rather than by base.html; popped while
+    streaming, they would stay in the session and show again on the next page.
+    """
+    return stream_template(template_name, flashed_messages=get_flashed_messages(with_categories=True), **context)
+
+
+def count_rows(statement):
+    """COUNT(*) for the rows a select() would return"""
+    return db.session.execute(
+        db.select(db.func.count()).select_from(statement.order_by(None).subquery())
+    ).scalar()
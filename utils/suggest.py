@@ -0,0 +1,450 @@
+"""
+Search Suggestions
+In-memory prefix and typo index over product and category names, used for
+typo-tolerant autocomplete
+"""
+import bisect
+import heapq
+from collections import OrderedDict
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from flask import current_app
+
+from models import db, Category, Product
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+FUZZY_WORD_RE = re.compile(r'[a-z]{3,}')  # Words eligible for typo correction (not SKUs or sizes)
+
+CATEGORY_WEIGHT = 1  # Categories outrank products that match equally well
+MAX_PREFIX_WORDS = 50  # Vocabulary words a prefix may expand to
+MAX_FUZZY_WORDS = 8  # Closest misspelling candidates kept per token
+MAX_SCAN = 500  # Items examined per multi-word query; bounds latency when words rarely co-occur
+WORD_SET_CACHE_ITEMS = 2_000_000  # Total keys held in cached per-word sets used for multi-word matching
+
+# Match quality tiers, best first
+EXACT, PREFIX, FUZZY = 0, 1, 2
+
+
+def tokenize(text):
+    """Lowercase, strip accents and split into alphanumeric words"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return WORD_RE.findall(text.encode('ascii', 'ignore').decode())
+
+
+def deletes(word, depth=1):
+    """The word and every variant with up to depth letters deleted"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+def max_edits(token):
+    """Typos tolerated for a token of this length"""
+    return 1 if len(token) <= 5 else 2
+
+
+def _fuzzy_eligible(word):
+    return FUZZY_WORD_RE.fullmatch(word) is not None
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent swaps count once), or limit + 1 if it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _key(kind, id):
+    """Products use their id as key, categories its negative"""
+    return id if kind == 'product' else -id
+
+
+class SuggestIndex:
+    """
+    Autocomplete index over product and category names.
+
+    Each distinct word maps to the items containing it, kept sorted by rank
+    (categories first, then shorter names), so the top-k for a word is a
+    slice. A query token expands to vocabulary words by exact match, by
+    prefix (the token being typed, via bisect over the sorted vocabulary),
+    or, when neither matches, by typo correction.
+
+    Typo correction uses a deletion index: every alphabetic word is stored
+    under itself and each variant with up to max_edits(word) letters
+    deleted. Deleting as many letters from the query and looking the results
+    up finds words within one or two typos (including swapped letters) in a
+    number of dict lookups that depends on the query's length, not the
+    vocabulary's size; candidates are then confirmed with an exact edit
+    distance. Two typos can both fall on the word's side (hoddie for
+    hoodies), which is why long words are stored two deletions deep.
+    """
+
+    def __init__(self):
+        self._names = {}  # key -> display name
+        self._ranks = {}  # key -> sort rank, lower is better
+        self._word_items = {}  # word -> keys sorted by rank
+        self._words = []  # Sorted vocabulary
+        self._deletes = {}  # word or deletion variant -> words it came from
+        self._word_sets = OrderedDict()  # word -> frozenset of its keys, least recently used first
+        self._word_sets_size = 0
+        self._lock = threading.RLock()
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._names)
+
+    # ---- building and incremental updates ----
+
+    def _rank(self, key, name):
+        weight = CATEGORY_WEIGHT if key < 0 else 0
+        return -weight * 1000 + min(len(name), 999)
+
+    def _index_deletes(self, word):
+        if _fuzzy_eligible(word):
+            for variant in deletes(word, depth=max_edits(word)):
+                self._deletes.setdefault(variant, set()).add(word)
+
+    def _add_word(self, word):
+        bisect.insort(self._words, word)
+        self._index_deletes(word)
+
+    def _remove_word(self, word):
+        index = bisect.bisect_left(self._words, word)
+        if index < len(self._words) and self._words[index] == word:
+            del self._words[index]
+        if _fuzzy_eligible(word):
+            for variant in deletes(word, depth=max_edits(word)):
+                words = self._deletes.get(variant)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self._deletes[variant]
+
+    def _add(self, key, name):
+        rank = self._rank(key, name)
+        self._names[key] = name
+        self._ranks[key] = rank
+        for word in set(tokenize(name)):
+            items = self._word_items.get(word)
+            if items is None:
+                self._word_items[word] = [key]
+                self._add_word(word)
+            else:
+                bisect.insort(items, key, key=self._ranks.__getitem__)
+                self._forget_word_set(word)
+
+    def _remove(self, key):
+        name = self._names.get(key)
+        if name is None:
+            return
+        for word in set(tokenize(name)):
+            items = self._word_items.get(word)
+            if not items:
+                continue
+            try:
+                items.remove(key)
+            except ValueError:
+                pass
+            self._forget_word_set(word)
+            if not items:
+                del self._word_items[word]
+                self._remove_word(word)
+        del self._names[key]
+        del self._ranks[key]
+
+    def add(self, kind, id, name):
+        """Add or update a product or category"""
+        key = _key(kind, id)
+        with self._lock:
+            self._remove(key)
+            self._add(key, name)
+
+    def remove(self, kind, id):
+        """Remove a product or category"""
+        with self._lock:
+            self._remove(_key(kind, id))
+
+    def bulk_load(self, items):
+        """Load (kind, id, name) tuples into an empty index, sorting each word's items once"""
+        with self._lock:
+            for kind, id, name in items:
+                key = _key(kind, id)
+                self._names[key] = name
+                self._ranks[key] = self._rank(key, name)
+                for word in set(tokenize(name)):
+                    self._word_items.setdefault(word, []).append(key)
+            for items in self._word_items.values():
+                items.sort(key=self._ranks.__getitem__)
+            self._words = sorted(self._word_items)
+            for word in self._words:
+                self._index_deletes(word)
+
+    # ---- querying ----
+
+    def _fuzzy(self, token):
+        """Vocabulary words within a few typos of the token, closest and most common first"""
+        if not _fuzzy_eligible(token):
+            return []
+        limit = max_edits(token)
+        candidates = set()
+        for variant in deletes(token, depth=limit):
+            candidates.update(self._deletes.get(variant, ()))
+
+        scored = []
+        for word in candidates:
+            distance = edit_distance(token, word, limit)
+            if distance <= limit:
+                scored.append((distance, -len(self._word_items[word]), word))
+        scored.sort()
+        return [word for _, _, word in scored[:MAX_FUZZY_WORDS]]
+
+    def _expand(self, token, prefix):
+        """Map a query token to {vocabulary word: tier}"""
+        matches = {}
+        if token in self._word_items:
+            matches[token] = EXACT
+        if prefix:
+            start = bisect.bisect_left(self._words, token)
+            for word in self._words[start:start + MAX_PREFIX_WORDS]:
+                if not word.startswith(token):
+                    break
+                matches.setdefault(word, PREFIX)
+        if not matches:
+            for word in self._fuzzy(token):
+                matches[word] = FUZZY
+        return matches
+
+    def _stream(self, word, tier):
+        """Lazily yield (tier, rank, key) for a word's items in rank order"""
+        ranks = self._ranks
+        for key in self._word_items[word]:
+            yield tier, ranks[key], key
+
+    def _word_set(self, word):
+        """Set of a word's keys for O(1) membership tests, cached with an LRU bounded by total size"""
+        keys = self._word_sets.get(word)
+        if keys is not None:
+            self._word_sets.move_to_end(word)
+            return keys
+        keys = self._word_sets[word] = frozenset(self._word_items[word])
+        self._word_sets_size += len(keys)
+        while self._word_sets_size > WORD_SET_CACHE_ITEMS and len(self._word_sets) > 1:
+            _, evicted = self._word_sets.popitem(last=False)
+            self._word_sets_size -= len(evicted)
+        return keys
+
+    def _forget_word_set(self, word):
+        keys = self._word_sets.pop(word, None)
+        if keys is not None:
+            self._word_sets_size -= len(keys)
+
+    def _match_others(self, key, others, tier):
+        """Worst tier at which key matches every other token, or None if some token doesn't match"""
+        for other in others:
+            best = None
+            for word, word_tier in other.items():
+                if (best is None or word_tier < best) and key in self._word_set(word):
+                    best = word_tier
+            if best is None:
+                return None
+            tier = max(tier, best)
+        return tier
+
+    def _intersect(self, expansions, limit):
+        """Best limit (tier, rank, key) items matching every token, found by set intersection"""
+        driver, others = expansions[0], expansions[1:]
+        # Narrow from the token matching the fewest items; set & frozenset walks the smaller side
+        matches = set().union(*(self._word_set(word) for word in driver))
+        for words in others:
+            matches = set().union(*(matches & self._word_set(word) for word in words))
+            if not matches:
+                return []
+
+        # An item's tier is its worst token's best word, so collect items tier by tier
+        results, placed = [], set()
+        for tier in (EXACT, PREFIX, FUZZY):
+            keys = matches
+            for words in expansions:
+                keys = set().union(*(keys & self._word_set(word) for word, word_tier in words.items() if word_tier <= tier))
+            keys -= placed
+            placed |= keys
+            results.extend((tier, self._ranks[key], key)
+                           for key in heapq.nsmallest(limit - len(results), keys, key=self._ranks.__getitem__))
+            if len(results) >= limit:
+                break
+        return results
+
+    def suggest(self, query, limit=8):
+        """Return up to limit (kind, id, name) suggestions for a partially typed query"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            # The last token is still being typed, so it also matches as a prefix
+            expansions = [self._expand(token, prefix=(i == len(tokens) - 1)) for i, token in enumerate(tokens)]
+            if not all(expansions):
+                return []
+
+            # Drive the scan from the token matching the fewest items
+            expansions.sort(key=lambda words: sum(len(self._word_items[w]) for w in words))
+            driver, others = expansions[0], expansions[1:]
+            if len(driver) == 1:
+                word, tier = next(iter(driver.items()))
+                candidates = self._stream(word, tier)
+            else:
+                candidates = heapq.merge(*(self._stream(word, tier) for word, tier in driver.items()))
+
+            results, seen = [], set()
+            exhausted = True
+            for scanned, (tier, rank, key) in enumerate(candidates):
+                if len(results) >= limit:
+                    break
+                if scanned >= MAX_SCAN:
+                    exhausted = False
+                    break
+                if key in seen:
+                    continue
+                seen.add(key)
+                if others:
+                    tier = self._match_others(key, others, tier)
+                    if tier is None:
+                        continue
+                results.append((tier, rank, key))
+
+            if len(results) < limit and not exhausted:
+                # The words rarely appear together, so intersect their sets instead of scanning further
+                results = self._intersect(expansions, limit)
+
+            results.sort()
+            return [('category' if key < 0 else 'product', abs(key), self._names[key])
+                    for _, _, key in results[:limit]]
+
+
+def build_suggest_index(batch_size=5000):
+    """Build a fresh index from the database (requires an app context)"""
+    started = time.perf_counter()
+    index = SuggestIndex()
+
+    def rows():
+        for id, name in db.session.execute(db.select(Category.id, Category.name)):
+            yield 'category', id, name
+        for id, name in db.session.execute(
+            db.select(Product.id, Product.name).execution_options(yield_per=batch_size)
+        ):
+            yield 'product', id, name
+
+    index.bulk_load(rows())
+    logger.info(f"Built search suggestion index: {len(index)} names, {len(index._words)} words "
+                f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return index
+
+
+def init_suggest(app):
+    """Register suggestion settings; the index itself is built on first use or by warm_suggest_index"""
+    app.config.setdefault('SUGGEST_LIMIT', 8)
+    # Seconds before a worker rebuilds its index in the background to pick up
+    # writes made by other workers (writes in this worker apply immediately); 0 never rebuilds
+    app.config.setdefault('SUGGEST_REFRESH_INTERVAL', 600)
+    app.extensions['suggest_index'] = None
+    app.extensions['suggest_refresh_lock'] = threading.Lock()
+
+
+def warm_suggest_index(app):
+    """
+    Build the index up front (e.g. in gunicorn's master before forking).
+
+    A database that can't be read yet (a fresh deploy before init_db.py has
+    created the tables) must not stop the server from booting, so errors are
+    logged and the index is left to be built on first use.
+    Returns True if the index was built.
+    """
+    try:
+        with app.app_context():
+            app.extensions['suggest_index'] = build_suggest_index()
+    except Exception as e:
+        logger.error(f"❌ Failed to build search suggestion index at startup; it will be built on first use: {e}")
+        return False
+    return True
+
+
+def _refresh_in_background(app):
+    lock = app.extensions['suggest_refresh_lock']
+    if not lock.acquire(blocking=False):
+        return  # A refresh is already running
+
+    def refresh():
+        try:
+            with app.app_context():
+                app.extensions['suggest_index'] = build_suggest_index()
+        except Exception as e:
+            logger.error(f"❌ Failed to refresh search suggestion index: {e}")
+        finally:
+            lock.release()
+
+    threading.Thread(target=refresh, name='suggest-refresh', daemon=True).start()
+
+
+def get_suggest_index(app=None):
+    """Return the app's suggestion index, building it on first use"""
+    app = app or current_app._get_current_object()
+    index = app.extensions.get('suggest_index')
+    if index is None:
+        with app.extensions['suggest_refresh_lock']:
+            index = app.extensions.get('suggest_index')
+            if index is None:
+                index = app.extensions['suggest_index'] = build_suggest_index()
+        return index
+
+    interval = app.config['SUGGEST_REFRESH_INTERVAL']
+    if interval and time.monotonic() - index.built_at > interval:
+        _refresh_in_background(app)
+    return index
+
+
+def index_product(product_id, name):
+    """Add or update a product in the index, if it has been built"""
+    index = current_app.extensions.get('suggest_index')
+    if index is not None:
+        index.add('product', product_id, name)
+
+
+def unindex_product(product_id):
+    """Remove a product from the index, if it has been built"""
+    index = current_app.extensions.get('suggest_index')
+    if index is not None:
+        index.remove('product', product_id)
+
+
+def index_category(category_id, name):
+    """Add or update a category in the index, if it has been built"""
+    index = current_app.extensions.get('suggest_index')
+    if index is not None:
+        index.add('category', category_id, name)
+
+
+def unindex_category(category_id):
+    """Remove a category from the index, if it has been built"""
+    index = current_app.extensions.get('suggest_index')
+    if index is not None:
+        index.remove('category', category_id)
@@ -0,0 +1,188 @@
+"""
+Login Throttling
+Sliding-window limits on login attempts per client IP and per email, checked
+before any password hash is verified so credential-stuffing bursts are
+rejected cheaply
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, LoginThrottle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_KEYS = 100_000  # Per worker; the least recently used keys are evicted first
+DB_EVICT_EVERY = 500  # Database hits between sweeps of expired rows
+
+
+def _roll(window, previous, current, now_window):
+    """Shift stored counts to the current window; counts two or more windows old are dropped"""
+    if window == now_window:
+        return previous, current
+    if window == now_window - 1:
+        return current, 0
+    return 0, 0
+
+
+def _estimate(previous, current, now, window_seconds):
+    """Sliding-window count: the previous window weighted by how much of it still overlaps"""
+    overlap = 1 - (now % window_seconds) / window_seconds
+    return previous * overlap + current
+
+
+class MemoryBackend:
+    """Per-worker counters: three integers per key, evicted once idle for two windows"""
+
+    def __init__(self, max_keys=DEFAULT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()  # key -> (window, previous, current), least recently hit first
+        self._lock = threading.Lock()
+
+    def _evict(self, now_window):
+        """Pop keys from the cold end while they are expired or over capacity"""
+        while self._counters:
+            window = next(iter(self._counters.values()))[0]
+            if window >= now_window - 1 and len(self._counters) <= self.max_keys:
+                break
+            self._counters.popitem(last=False)
+
+    def hit(self, key, limit, window_seconds, now):
+        """Count an attempt for key if it is under limit; returns False if rejected"""
+        now_window = int(now // window_seconds)
+        with self._lock:
+            self._evict(now_window)
+            entry = self._counters.pop(key, None)
+            previous, current = _roll(*entry, now_window) if entry else (0, 0)
+            allowed = _estimate(previous, current, now, window_seconds) < limit
+            self._counters[key] = (now_window, previous, current + 1 if allowed else current)
+        return allowed
+
+    def reset(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+
+
+class DatabaseBackend:
+    """
+    Counters in the login_throttle table so every worker and node shares them.
+
+    One row per key. Increments within a window are atomic UPDATEs; rolling
+    to a new window is last-writer-wins, which can lose a few counts under
+    contention. That is acceptable for throttling.
+    """
+
+    def __init__(self):
+        self._hits = 0
+
+    def hit(self, key, limit, window_seconds, now):
+        table = LoginThrottle.__table__
+        now_window = int(now // window_seconds)
+
+        with db.engine.begin() as conn:
+            row = conn.execute(
+                db.select(table.c.window, table.c.previous_count, table.c.current_count).where(table.c.key == key)
+            ).first()
+            previous, current = _roll(*row, now_window) if row else (0, 0)
+            allowed = _estimate(previous, current, now, window_seconds) < limit
+
+            if row is None:
+                if allowed:
+                    try:
+                        with conn.begin_nested():
+                            conn.execute(db.insert(table).values(
+                                key=key, window=now_window, previous_count=0, current_count=1
+                            ))
+                    except IntegrityError:
+                        pass  # Another worker created it first; this attempt goes uncounted
+            elif row.window == now_window:
+                if allowed:
+                    conn.execute(db.update(table).where(table.c.key == key)
+                                 .values(current_count=table.c.current_count + 1))
+            else:
+                conn.execute(db.update(table).where(table.c.key == key).values(
+                    window=now_window, previous_count=previous, current_count=current + 1 if allowed else current
+                ))
+
+            self._hits += 1
+            if self._hits % DB_EVICT_EVERY == 0:
+                conn.execute(db.delete(table).where(table.c.window < now_window - 1))
+
+        return allowed
+
+    def reset(self, key):
+        table = LoginThrottle.__table__
+        with db.engine.begin() as conn:
+            conn.execute(db.delete(table).where(table.c.key == key))
+
+
+class LoginLimiter:
+    """Applies the per-IP and per-email limits and keeps per-worker rejection metrics"""
+
+    def __init__(self, backend, window_seconds, ip_limit, email_limit):
+        self.backend = backend
+        self.window_seconds = window_seconds
+        self.ip_limit = ip_limit
+        self.email_limit = email_limit
+        self.stats = {'allowed': 0, 'rejected_ip': 0, 'rejected_email': 0}
+        self._stats_lock = threading.Lock()
+
+    def _record(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def allow(self, ip, email):
+        """Count a login attempt; returns False if the IP or the email is over its limit"""
+        now = time.time()
+        if not self.backend.hit(f'ip:{ip}', self.ip_limit, self.window_seconds, now):
+            self._record('rejected_ip')
+            logger.warning(f"⚠️ Login attempt rejected: too many attempts from {ip}")
+            return False
+        if not self.backend.hit(f'email:{email.lower()}', self.email_limit, self.window_seconds, now):
+            self._record('rejected_email')
+            logger.warning(f"⚠️ Login attempt rejected: too many attempts for {email}")
+            return False
+        self._record('allowed')
+        return True
+
+    def reset_email(self, email):
+        """Clear an email's attempts after a successful login"""
+        self.backend.reset(f'email:{email.lower()}')
+
+    def retry_after(self):
+        """Seconds until the current window rolls over (a conservative Retry-After)"""
+        return int(self.window_seconds - time.time() % self.window_seconds) + 1
+
+
+def init_login_throttle(app):
+    """Create the login limiter selected by LOGIN_THROTTLE_BACKEND and register it on the app"""
+    app.config.setdefault('LOGIN_THROTTLE_BACKEND', 'memory')
+    app.config.setdefault('LOGIN_THROTTLE_WINDOW', 300)  # Seconds
+    app.config.setdefault('LOGIN_THROTTLE_PER_IP', 30)  # Attempts per window from one IP
+    app.config.setdefault('LOGIN_THROTTLE_PER_EMAIL', 10)  # Attempts per window against one account
+
+    backend_name = app.config['LOGIN_THROTTLE_BACKEND']
+    if backend_name == 'database':
+        backend = DatabaseBackend()
+    elif backend_name == 'memory':
+        backend = MemoryBackend()
+    else:
+        raise ValueError(f"Unknown LOGIN_THROTTLE_BACKEND: {backend_name}")
+
+    limiter = LoginLimiter(
+        backend,
+        window_seconds=app.config['LOGIN_THROTTLE_WINDOW'],
+        ip_limit=app.config['LOGIN_THROTTLE_PER_IP'],
+        email_limit=app.config['LOGIN_THROTTLE_PER_EMAIL'],
+    )
+    app.extensions['login_limiter'] = limiter
+    return limiter
+
+
+def get_login_limiter(app=None):
+    """Return the login limiter for app (defaults to the current app)"""
+    return (app or current_app).extensions['login_limiter']
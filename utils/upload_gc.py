@@ -0,0 +1,92 @@
+"""
+Upload Garbage Collector
+Finds stored images that no product references (failed saves, replaced images,
+databases recreated by init_db.py) and removes or quarantines them
+"""
+import logging
+import time
+
+from models import db, Product
+from utils.images import variant_filenames
+from utils.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Files shipped with the app that are never referenced by a product
+PROTECTED_FILES = {'placeholder.png', 'placeholder.svg'}
+
+DEFAULT_GRACE_PERIOD = 24 * 60 * 60  # Seconds; protects uploads whose product is still being saved
+
+
+def referenced_filenames():
+    """Load every image name in use (originals and their variants) in one query"""
+    referenced = set()
+    rows = db.session.query(Product.image_filename).filter(Product.image_filename.isnot(None)).distinct()
+    for (filename,) in rows:
+        referenced.add(filename)
+        referenced.update(variant_filenames(filename))
+    return referenced
+
+
+def _still_unreferenced(candidates):
+    """Re-check candidates just before removal in case an upload deduplicated onto one of them"""
+    if not candidates:
+        return candidates
+    in_use = referenced_filenames()
+    return [(name, size) for name, size in candidates if name not in in_use]
+
+
+def collect_orphans(app, grace_period=DEFAULT_GRACE_PERIOD, quarantine=False, dry_run=False):
+    """
+    Remove (or quarantine) stored images that no product references.
+
+    The storage listing is streamed, so memory is bounded by the number of
+    orphans rather than the size of the uploads folder. Only objects older than
+    grace_period are touched, which keeps the collector safe to run while the
+    app is serving uploads.
+    Returns a dict of statistics including bytes reclaimed.
+    """
+    stats = {'scanned': 0, 'orphans': 0, 'skipped_recent': 0, 'removed': 0, 'errors': 0, 'bytes_reclaimed': 0}
+
+    with app.app_context():
+        storage = get_storage(app)
+        referenced = referenced_filenames()
+        cutoff = time.time() - grace_period
+
+        candidates = []
+        for name, size, modified in storage.iter_objects():
+            stats['scanned'] += 1
+            if name in PROTECTED_FILES or name in referenced:
+                continue
+            if modified > cutoff:
+                stats['skipped_recent'] += 1
+                continue
+            candidates.append((name, size))
+
+        for name, size in _still_unreferenced(candidates):
+            # store_upload() touches a blob it deduplicates onto before the product is saved,
+            # so one reused since the listing is newer than cutoff now
+            modified = storage.modified(name)
+            if modified is None:
+                continue
+            if modified > cutoff:
+                stats['skipped_recent'] += 1
+                continue
+            stats['orphans'] += 1
+            if dry_run:
+                logger.info(f"Would remove orphaned upload {name} ({size} bytes)")
+                stats['bytes_reclaimed'] += size
+                continue
+            try:
+                if quarantine:
+                    storage.quarantine(name)
+                else:
+                    storage.delete(name)
+            except Exception as e:
+                logger.error(f"❌ Failed to remove orphaned upload {name}: {e}")
+                stats['errors'] += 1
+                continue
+            stats['removed'] += 1
+            stats['bytes_reclaimed'] += size
+
+    return stats
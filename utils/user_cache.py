@@ -0,0 +1,116 @@
+"""
+User Cache
+Per-worker cache of the logged-in user's identity so Flask-Login's user loader
+doesn't query the database on every authenticated request
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from models import db, User
+
+DEFAULT_TTL = 30  # Seconds; bounds how stale another worker's copy can be
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class CachedUser(UserMixin):
+    """Detached, read-only snapshot of a User with the fields pages and emails use"""
+
+    __slots__ = ('id', 'name', 'email', 'is_admin')
+
+    def __init__(self, id, name, email, is_admin):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.is_admin = bool(is_admin)
+
+    def __repr__(self):
+        return f'<CachedUser {self.email}>'
+
+
+class UserCache:
+    """
+    TTL cache of CachedUser by id, bounded to max_entries with LRU eviction.
+
+    Entries expire after ttl seconds. Writes to a User through the ORM in this
+    process invalidate its entry immediately (see init_user_cache); other
+    workers pick up the change when their entry expires. Expired entries are
+    replaced when their user comes back and otherwise age out of the LRU, so
+    a worker holds at most max_entries users however many have logged in.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Return the cached user, loading it with a single-row query on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        row = db.session.execute(
+            db.select(User.id, User.name, User.email, User.is_admin).where(User.id == user_id)
+        ).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        user = CachedUser(*row)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return user
+
+    def __len__(self):
+        return len(self._entries)
+
+    def invalidate(self, user_id):
+        """Drop a user's entry"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+
+def _invalidate_cached_user(mapper, connection, target):
+    if has_app_context():
+        cache = current_app.extensions.get('user_cache')
+        if cache is not None:
+            cache.invalidate(target.id)
+
+
+def init_user_cache(app):
+    """Create the user cache and invalidate entries whenever a User row changes"""
+    app.config.setdefault('USER_CACHE_TTL', DEFAULT_TTL)
+    app.config.setdefault('USER_CACHE_SIZE', DEFAULT_MAX_ENTRIES)  # Users cached per worker
+    cache = UserCache(ttl=app.config['USER_CACHE_TTL'], max_entries=app.config['USER_CACHE_SIZE'])
+    app.extensions['user_cache'] = cache
+
+    # Covers admin flag/name/email changes and deletes made through the ORM,
+    # e.g. admin_delete_user(); bulk UPDATE/DELETE statements bypass these events.
+    # The listeners are global to the User mapper, so they are added once and
+    # find the cache of whichever app is current.
+    for identifier in ('after_update', 'after_delete'):
+        if not event.contains(User, identifier, _invalidate_cached_user):
+            event.listen(User, identifier, _invalidate_cached_user)
+    return cache
+
+
+def get_user_cache(app=None):
+    """Return the user cache for app (defaults to the current app)"""
+    return (app or current_app).extensions['user_cache']
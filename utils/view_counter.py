@@ -0,0 +1,135 @@
+"""
+View Counter
+Write-behind product view counts: page views are tallied in memory per worker
+and added to the database in one batched statement every few seconds
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+
+from flask import current_app
+
+from models import db, Product
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Per-worker product view tallies, flushed by a background thread.
+
+    A flush happens every flush_interval seconds, or sooner once
+    flush_threshold views are pending, and adds every pending count with one
+    executemany UPDATE on its own connection, so a popular product page costs
+    a dict increment rather than a write per hit. Counts that fail to flush
+    are kept for the next attempt. The thread starts on first use in each
+    process, so it runs in forked workers rather than the master, and
+    close() does a final flush at worker exit.
+    """
+
+    def __init__(self, app, flush_interval=10.0, flush_threshold=1000):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.stats = {'views': 0, 'flushes': 0, 'rows': 0, 'failures': 0}
+        self._pending = Counter()
+        self._pending_views = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._closed = False
+
+    def _start(self):
+        """Start this process's flusher thread (called with the lock held)"""
+        self._pid = os.getpid()
+        self._pending.clear()  # Anything inherited across a fork belongs to the parent
+        self._pending_views = 0
+        self._wake = threading.Event()
+        threading.Thread(target=self._run, name='view-counter', daemon=True).start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def record(self, product_id):
+        """Count one view of product_id"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            self._pending[product_id] += 1
+            self._pending_views += 1
+            self.stats['views'] += 1
+            if self._pending_views == self.flush_threshold:
+                self._wake.set()
+
+    def pending(self):
+        """Views counted in this worker but not yet written"""
+        return self._pending_views
+
+    def flush(self):
+        """Write pending views to the database; returns the number of products updated"""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            pending_views, self._pending_views = self._pending_views, 0
+        if not pending:
+            return 0
+
+        product = Product.__table__
+        rows = [{'product_id': product_id, 'views': views} for product_id, views in sorted(pending.items())]
+        try:
+            with self.app.app_context(), db.engine.begin() as conn:
+                conn.execute(
+                    db.update(product)
+                    .where(product.c.id == db.bindparam('product_id'))
+                    .values(view_count=product.c.view_count + db.bindparam('views')),
+                    rows
+                )
+        except Exception as e:
+            with self._lock:
+                self._pending.update(pending)  # Try again on the next flush
+                self._pending_views += pending_views
+                self.stats['failures'] += 1
+            logger.error(f"❌ Failed to flush {len(rows)} product view counts: {e}")
+            return 0
+
+        with self._lock:
+            self.stats['flushes'] += 1
+            self.stats['rows'] += len(rows)
+        return len(rows)
+
+    def close(self):
+        """Stop the flusher and write what is left (at worker exit)"""
+        self._closed = True
+        self._wake.set()
+        if self._pid == os.getpid():
+            self.flush()
+
+
+def init_view_counter(app):
+    """Create the product view counter from config and register it on the app (None when disabled)"""
+    app.config.setdefault('VIEW_COUNTING', True)
+    app.config.setdefault('VIEW_FLUSH_INTERVAL', 10.0)  # Seconds between writes
+    app.config.setdefault('VIEW_FLUSH_THRESHOLD', 1000)  # Pending views that trigger an early write
+    counter = None
+    if app.config['VIEW_COUNTING']:
+        counter = ViewCounter(app, flush_interval=app.config['VIEW_FLUSH_INTERVAL'],
+                              flush_threshold=app.config['VIEW_FLUSH_THRESHOLD'])
+        atexit.register(counter.close)  # Also called from gunicorn's worker_exit hook
+    app.extensions['view_counter'] = counter
+    return counter
+
+
+def get_view_counter(app=None):
+    """Return the view counter for app (defaults to the current app), or None when disabled"""
+    return (app or current_app).extensions['view_counter']
+
+
+def count_view(product_id):
+    """Count a product page view, if view counting is enabled"""
+    counter = get_view_counter()
+    if counter is not None:
+        counter.record(product_id)